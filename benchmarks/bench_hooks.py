@@ -0,0 +1,713 @@
+#!/usr/bin/env python3
+"""
+Tool: Hook Latency Benchmarks
+Purpose: Measure hook latency on synthetic corpora and gate regressions.
+Usage:
+    python3 benchmarks/bench_hooks.py [--quick] [--suite NAME ...] [--output FILE]
+    python3 benchmarks/bench_hooks.py --compare FILE [--tolerance 0.25]
+
+Every hook sits on the critical path of a tool call, so each suite measures:
+  - cold: a fresh `python3 hooks/<hook>.py` process per call (what Claude Code pays)
+  - warm: the hook's main() called in-process (what the hook server pays)
+The tasks suite times session_status.get_task_summary against a seeded
+tasks.db (up to 1M rows) directly, bypassing the section cache, and runs
+the whole briefing (main() --refresh) on a fresh copy, where a tasks
+section missing its deadline fails the run. The recall
+suite times memory_index searches and incremental updates over years of logs.
+The memory suite also times one Stop per response against a 1-50 MB
+transcript, which should cost the same at any transcript size.
+The telemetry suite runs warm guardrail_check with recording off and on; a
+p50 difference over telemetry.OVERHEAD_BUDGET_MS fails the run. It also runs
+it cold with recording off, where loading any of the recorder's modules
+(RECORDER_MODULES) fails the run.
+The validate suite always includes a cold run over the streaming threshold;
+a peak RSS over STREAM_RSS_BUDGET_KB there fails the run.
+The small-payload cold scenarios (guardrail.cold, validate.cold up to 64kb)
+record import_ms, the hook module's cumulative import time in a fresh
+interpreter (best of COLD_IMPORT_RUNS); over COLD_IMPORT_BUDGET_MS fails the
+run, as does a small validate payload loading a streaming-only module
+(STREAMING_MODULES).
+
+Reports p50/p95/p99 latency in ms plus peak memory (peak RSS of the child for
+cold runs, peak Python allocations via tracemalloc for warm runs) and writes
+the results as JSON. --compare re-runs the same suites and exits 1 if any
+scenario's p95 regressed beyond the tolerance.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+HOOKS_DIR = REPO_ROOT / "hooks"
+sys.path.insert(0, str(HOOKS_DIR))
+
+import guardrail_check  # noqa: E402
+import hook_probe  # noqa: E402
+import memory_capture  # noqa: E402
+import memory_index  # noqa: E402
+import session_status  # noqa: E402
+import telemetry  # noqa: E402
+import validate_output  # noqa: E402
+
+DEFAULT_OUTPUT = REPO_ROOT / "benchmarks" / "baseline.json"
+
+# p95 may grow by this fraction before --compare fails...
+DEFAULT_TOLERANCE = 0.25
+# ...plus this absolute slack, so microsecond-scale scenarios don't flap on noise
+ABSOLUTE_SLACK_MS = 0.05
+
+KB = 1024
+MB = 1024 * KB
+
+# Hook input past validate_output.STREAM_THRESHOLD is validated in bounded
+# memory; the cold process may peak at this much RSS (about 3x the 8 MiB
+# head it reads before streaming)
+STREAM_RSS_BUDGET_KB = 96 * 1024
+STREAM_SIZE = 12 * MB
+
+# Small-payload cold hooks: the hook module's own import (its imports included,
+# no bytecode cache assumed) must stay under this. guardrail_check and
+# validate_output measure about 18 and 22 ms; json_stream alone adds ~45 ms
+COLD_IMPORT_BUDGET_MS = 35.0
+COLD_IMPORT_RUNS = 3
+SMALL_PAYLOAD = 64 * KB
+
+# Only validate_output's streaming path needs these; a small payload must not load them
+STREAMING_MODULES = ("json_stream",)
+
+# What telemetry.py pulls in; a cold hook with telemetry off must load none of it
+RECORDER_MODULES = ("telemetry", "argparse", "datetime", "struct", "contextlib", "log_writer")
+
+
+# --- Synthetic corpora -------------------------------------------------------
+
+COMMAND_TEMPLATES = [
+    "ls -la {path}",
+    "cat {path}",
+    "git status",
+    "git diff {path}",
+    "git log --oneline -n {n}",
+    "git add {path} && git commit -m 'Update {word}'",
+    "git push origin {word}",
+    "python3 {path} --limit {n}",
+    "python3 -m pytest -q {path}",
+    "npm run {word}",
+    "grep -rn '{word}' {path} | head -{n}",
+    "find . -name '*.{ext}' -type f",
+    "rm {path}",
+    "rm -rf .tmp/{word}",
+    "mkdir -p {path} && cd {path}",
+    "sqlite3 data/tasks.db 'SELECT * FROM tasks LIMIT {n}'",
+    "curl -s https://api.example.com/{word} | jq .",
+    "echo '{word}' >> {path}",
+    "cp {path} {path}.bak",
+    "git reset --hard HEAD~{n}",
+    "git push --force origin {word}",
+    "rm .env",
+]
+WORDS = ["main", "feature", "billing", "report", "tasks", "intake", "resume", "deploy", "cache", "audit"]
+EXTS = ["py", "md", "json", "ts", "yaml"]
+
+
+def make_commands(count: int, seed: int = 7) -> list:
+    """Realistic Bash commands, with the repetition agents actually produce."""
+    rng = random.Random(seed)
+    commands = []
+    for _ in range(count):
+        if commands and rng.random() < 0.3:
+            commands.append(rng.choice(commands))  # re-run of an earlier command
+            continue
+        path = f"{rng.choice(['src', 'hooks', 'data', '.claude/skills'])}/{rng.choice(WORDS)}.{rng.choice(EXTS)}"
+        commands.append(rng.choice(COMMAND_TEMPLATES).format(
+            path=path, word=rng.choice(WORDS), ext=rng.choice(EXTS), n=rng.randint(1, 50)))
+    return commands
+
+
+def make_tool_output(size: int, seed: int = 11) -> str:
+    """A skill-script style JSON document of roughly `size` bytes."""
+    rng = random.Random(seed)
+    record = {"id": 0, "name": "", "status": "ok", "score": 0.0, "tags": ["a", "b"]}
+    record_size = len(json.dumps(record)) + 24
+    records = []
+    for i in range(max(1, size // record_size)):
+        records.append({
+            "id": i,
+            "name": rng.choice(WORDS) + str(i),
+            "status": rng.choice(["ok", "warn"]),
+            "score": round(rng.random(), 4),
+            "tags": rng.sample(WORDS, 2),
+        })
+    return json.dumps({"success": True, "count": len(records), "data": records})
+
+
+def hook_payload(**fields) -> str:
+    """Wrap tool data the way Claude Code passes it to a hook on stdin."""
+    payload = {"session_id": "bench", "tool_name": "Bash"}
+    payload.update(fields)
+    return json.dumps(payload)
+
+
+def make_project(root: Path, log_count: int, entries_per_log: int = 20, rng: random.Random = None) -> Path:
+    """Create a DSF-shaped project with `log_count` daily logs and a copy of hooks/.
+
+    With `rng`, entries are varied text (random words plus a ticket number)
+    instead of the Stop hook's fixed marker.
+    """
+    shutil.copytree(HOOKS_DIR, root / "hooks", ignore=shutil.ignore_patterns("__pycache__"))
+    logs_dir = root / "memory" / "logs"
+    logs_dir.mkdir(parents=True)
+    shutil.copy(REPO_ROOT / "memory" / "MEMORY.md", root / "memory" / "MEMORY.md")
+
+    today = datetime.now().date()
+    for offset in range(1, log_count + 1):
+        day = today - timedelta(days=offset)
+        lines = [f"# Daily Log: {day}\n\n> Session log\n\n---\n\n## Events & Notes\n\n"]
+        for i in range(entries_per_log):
+            text = "Session activity captured"
+            if rng:
+                text = " ".join(rng.choices(WORDS, k=8)) + f" ticket{rng.randint(0, 99_999)}"
+            lines.append(f"- [{9 + i % 9:02d}:{i % 60:02d}] {text}\n")
+        (logs_dir / f"{day}.md").write_text("".join(lines))
+    return root
+
+
+def point_at(module, root: Path):
+    """Redirect a hook module's project paths to a benchmark project."""
+    paths = {
+        "PROJECT_ROOT": root,
+        "MEMORY_DIR": root / "memory",
+        "MEMORY_MD": root / "memory" / "MEMORY.md",
+        "LOGS_DIR": root / "memory" / "logs",
+        "RULES_DIR": root / ".claude" / "rules",
+        "TASKS_DB": root / "data" / "tasks.db",
+        "CACHE_PATH": root / ".tmp" / "session_status.json",
+        "INDEX_DB": root / "data" / "memory_index.db",
+        "OFFSETS_DIR": root / "data" / "transcript_offsets",
+    }
+    for name, path in paths.items():
+        if hasattr(module, name):
+            setattr(module, name, path)
+
+
+# --- Runners -----------------------------------------------------------------
+
+def call_main(module, stdin_text: str) -> float:
+    """Run module.main() in-process with the given stdin. Returns seconds."""
+    saved_stdin, saved_stdout, saved_argv = sys.stdin, sys.stdout, sys.argv
+    sys.stdin, sys.stdout, sys.argv = io.StringIO(stdin_text), io.StringIO(), [module.__file__]
+    start = time.perf_counter()
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        sys.stdin, sys.stdout, sys.argv = saved_stdin, saved_stdout, saved_argv
+    return elapsed
+
+
+# On Linux a child's ru_maxrss inherits the parent's high-water mark across
+# fork/exec, so the child reports its own VmHWM (peak RSS) to stderr instead.
+_CHILD_WRAPPER = """
+import atexit, runpy, sys
+def report():
+    with open("/proc/self/status") as status:
+        sys.stderr.write(next(line for line in status if line.startswith("VmHWM:")))
+atexit.register(report)
+script = sys.argv[1]
+sys.argv = sys.argv[1:]
+sys.path[0] = script.rsplit("/", 1)[0]
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+def run_process(script: Path, stdin_text: str, env: dict = None) -> tuple:
+    """Run a hook script in a fresh interpreter. Returns (seconds, peak_rss_kb)."""
+    data = stdin_text.encode("utf-8")
+    use_proc = sys.platform.startswith("linux")
+    argv = [sys.executable, "-c", _CHILD_WRAPPER, str(script)] if use_proc else [sys.executable, str(script)]
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, env=env)
+    stderr = proc.communicate(data)[1]
+    elapsed = time.perf_counter() - start
+
+    if use_proc:
+        rss_kb = int(stderr.split(b"VmHWM:")[-1].split()[0]) if b"VmHWM:" in stderr else 0
+    else:
+        import resource  # Unix-only; ru_maxrss is bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        rss_kb = maxrss // 1024 if sys.platform == "darwin" else maxrss
+    return elapsed, rss_kb
+
+
+def peak_alloc_kb(module, stdin_text: str) -> int:
+    """Peak Python allocations of one warm call, via tracemalloc."""
+    tracemalloc.start()
+    try:
+        call_main(module, stdin_text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: list, **memory) -> dict:
+    ordered = sorted(samples)
+    summary = {
+        "n": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+    }
+    summary.update(memory)
+    return summary
+
+
+def warm(module, inputs: list) -> dict:
+    """Warm scenario: one in-process main() per input."""
+    call_main(module, inputs[0])  # first call pays imports/compiles
+    samples = [call_main(module, text) for text in inputs]
+    return summarize(samples, peak_alloc_kb=peak_alloc_kb(module, inputs[-1]))
+
+
+def cold(script: Path, inputs: list, env: dict = None) -> dict:
+    """Cold scenario: one fresh interpreter per input."""
+    run_process(script, inputs[0], env)  # warm the OS page cache and __pycache__
+    samples, peak_rss = [], 0
+    for text in inputs:
+        elapsed, rss_kb = run_process(script, text, env)
+        samples.append(elapsed)
+        peak_rss = max(peak_rss, rss_kb)
+    return summarize(samples, peak_rss_kb=peak_rss)
+
+
+def size_label(size: int) -> str:
+    return f"{size // MB}mb" if size >= MB else f"{size // KB}kb"
+
+
+# --- Suites ------------------------------------------------------------------
+
+def bench_guardrail(quick: bool, workdir: Path) -> dict:
+    commands = make_commands(2_000 if quick else 10_000)
+    inputs = [hook_payload(tool_input={"command": command}) for command in commands]
+    return {
+        "guardrail.warm": warm(guardrail_check, inputs),
+        "guardrail.cold": dict(cold(HOOKS_DIR / "guardrail_check.py", inputs[:10 if quick else 30]),
+                               import_ms=import_ms("guardrail_check")),
+    }
+
+
+def bench_validate(quick: bool, workdir: Path) -> dict:
+    sizes = [KB, 64 * KB, MB] if quick else [KB, 64 * KB, MB, 10 * MB, 50 * MB]
+    results = {}
+    for size in sizes:
+        text = hook_payload(tool_input={"command": "python3 skill.py"},
+                            tool_output=make_tool_output(size))
+        iterations = max(3, min(200, (20 * MB) // size))
+        label = size_label(size)
+        results[f"validate.warm.{label}"] = warm(validate_output, [text] * iterations)
+        script = HOOKS_DIR / "validate_output.py"
+        row = cold(script, [text] * max(3, min(20, iterations)))
+        if size <= SMALL_PAYLOAD:
+            row["import_ms"] = import_ms("validate_output")
+            row["streaming_modules"] = sorted(imported_modules(script, text, dict(os.environ))
+                                              & set(STREAMING_MODULES))
+        results[f"validate.cold.{label}"] = row
+
+    text = hook_payload(tool_input={"command": "python3 skill.py"}, tool_output=make_tool_output(STREAM_SIZE))
+    results[f"validate.stream.{size_label(STREAM_SIZE)}"] = cold(HOOKS_DIR / "validate_output.py", [text] * 3)
+    return results
+
+
+def import_ms(module: str) -> float:
+    """Best-of-COLD_IMPORT_RUNS cumulative import time of a hook module in a fresh interpreter, via -X importtime."""
+    code = f"import sys; sys.path.insert(0, {str(HOOKS_DIR)!r}); import {module}"
+    best = None
+    for _ in range(COLD_IMPORT_RUNS):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        for line in proc.stderr.decode("utf-8", "replace").splitlines():
+            fields = line.split("|")
+            if line.startswith("import time:") and len(fields) == 3 and fields[2].strip() == module:
+                micros = int(fields[1])
+                best = micros if best is None else min(best, micros)
+    return round(best / 1000, 3) if best is not None else 0.0
+
+
+def cold_import_time(results: dict) -> list:
+    """Messages for a small-payload cold hook whose imports exceed the budget or load streaming modules."""
+    messages = []
+    for name, row in results["scenarios"].items():
+        if row.get("import_ms", 0) > COLD_IMPORT_BUDGET_MS:
+            messages.append(f"{name}: hook import takes {row['import_ms']:.1f} ms "
+                            f"(budget {COLD_IMPORT_BUDGET_MS:.1f} ms)")
+        if row.get("streaming_modules"):
+            messages.append(f"{name}: small payload imported {', '.join(row['streaming_modules'])}")
+    return messages
+
+
+def stream_memory(results: dict) -> list:
+    """Messages for streaming validation runs that went over the RSS budget."""
+    return [f"{name}: peak RSS {row['peak_rss_kb']} KB (budget {STREAM_RSS_BUDGET_KB} KB)"
+            for name, row in results["scenarios"].items()
+            if name.startswith("validate.stream.") and row.get("peak_rss_kb", 0) > STREAM_RSS_BUDGET_KB]
+
+
+def bench_memory(quick: bool, workdir: Path) -> dict:
+    results = {}
+    # The first Stop of the day archives logs past DSF_LOG_ARCHIVE_DAYS; keep
+    # every synthetic log in place so each scenario measures its full count
+    saved = os.environ.get("DSF_LOG_ARCHIVE_DAYS")
+    os.environ["DSF_LOG_ARCHIVE_DAYS"] = "0"
+    try:
+        for log_count in ([1, 100] if quick else [1, 100, 5_000]):
+            root = make_project(workdir / f"memory-{log_count}", log_count)
+            point_at(memory_capture, root)
+            text = hook_payload(hook_event_name="Stop")
+            results[f"memory_capture.warm.{log_count}logs"] = warm(memory_capture, [text] * 200)
+            results[f"memory_capture.cold.{log_count}logs"] = cold(
+                root / "hooks" / "memory_capture.py", [text] * 10)
+    finally:
+        if saved is None:
+            os.environ.pop("DSF_LOG_ARCHIVE_DAYS", None)
+        else:
+            os.environ["DSF_LOG_ARCHIVE_DAYS"] = saved
+
+    # Per-response cost with a long transcript: should track the new bytes, not the total
+    for size in ([MB] if quick else [MB, 50 * MB]):
+        root = make_project(workdir / f"transcript-{size_label(size)}", 1)
+        point_at(memory_capture, root)
+        transcript = root / "transcript.jsonl"
+        transcript.write_text(make_transcript(size))
+        text = hook_payload(hook_event_name="Stop", session_id=f"bench-{size}",
+                            transcript_path=str(transcript), cwd=str(root))
+        while call_main(memory_capture, text) and transcript_behind(root, f"bench-{size}", transcript):
+            pass  # Ingest the existing history first (it may take several capped runs)
+
+        def respond():
+            with open(transcript, "a", encoding="utf-8") as f:
+                f.write(make_transcript(4 * KB))
+            call_main(memory_capture, text)
+
+        results[f"memory_capture.transcript.{size_label(size)}"] = timed(respond, 100)
+    return results
+
+
+def make_transcript(size: int, seed: int = 17) -> str:
+    """Claude Code-style transcript events (JSON Lines) totalling about `size` chars."""
+    rng = random.Random(seed)
+    lines, total = [], 0
+    while total < size:
+        command = rng.choice(make_commands(1, seed=rng.randint(0, 10**6)))
+        events = [
+            {"type": "assistant", "message": {"role": "assistant", "content": [
+                {"type": "text", "text": f"Going with {rng.choice(WORDS)} instead of {rng.choice(WORDS)}."},
+                {"type": "tool_use", "name": "Bash", "input": {"command": command}},
+                {"type": "tool_use", "name": "Edit", "input": {"file_path": f"src/{rng.choice(WORDS)}.py"}},
+            ]}},
+            {"type": "user", "message": {"role": "user", "content": [
+                {"type": "tool_result", "content": "x" * rng.randint(100, 2000)}]}},
+        ]
+        for event in events:
+            line = json.dumps(event) + "\n"
+            lines.append(line)
+            total += len(line)
+    return "".join(lines)
+
+
+def transcript_behind(root: Path, session_id: str, transcript: Path) -> bool:
+    """True while memory_capture hasn't caught up with the whole transcript."""
+    state = root / "data" / "transcript_offsets" / f"{session_id}.json"
+    try:
+        return json.loads(state.read_text())["offset"] < transcript.stat().st_size
+    except (OSError, ValueError, KeyError):
+        return True
+
+
+def bench_status(quick: bool, workdir: Path) -> dict:
+    results = {}
+    for log_count in ([1, 100] if quick else [1, 100, 1_000, 5_000]):
+        root = make_project(workdir / f"status-{log_count}", log_count)
+        point_at(session_status, root)
+        results[f"session_status.warm.{log_count}logs"] = warm(session_status, [""] * 50)
+        results[f"session_status.cold.{log_count}logs"] = cold(
+            root / "hooks" / "session_status.py", [""] * 10)
+    return results
+
+
+def seed_tasks(db_path: Path, rows: int, seed: int = 5):
+    """A tasks.db shaped like the task-manager skill's, with `rows` tasks."""
+    rng = random.Random(seed)
+    today = datetime.now().date()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT, project TEXT,"
+                 " status TEXT, priority INTEGER, due_date TEXT, created_at TEXT)")
+    conn.executemany(
+        "INSERT INTO tasks (title, project, status, priority, due_date, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Task {i}", rng.choice(WORDS), rng.choice(["pending", "done", "done", "in_progress"]),
+          rng.randint(1, 4),
+          None if rng.random() < 0.2 else str(today + timedelta(days=rng.randint(-60, 60))),
+          str(today)) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, iterations: int) -> dict:
+    """Warm scenario for a plain function call."""
+    fn()  # first call may prepare state (index, WAL)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def briefing(argv: list) -> dict:
+    """Run session_status.main() in-process and return its JSON output."""
+    saved_stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        session_status.main(argv)
+        return json.loads(sys.stdout.getvalue())
+    finally:
+        sys.stdout = saved_stdout
+
+
+def wait_for_tasks_index(db_path: Path, limit: float = 60.0):
+    """Wait for the detached --prepare-tasks process to commit the covering index."""
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+        try:
+            if session_status.has_status_due_index(conn):
+                return
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+        time.sleep(0.05)
+
+
+def bench_tasks(quick: bool, workdir: Path) -> dict:
+    results = {}
+    for rows in ([100_000] if quick else [10_000, 1_000_000]):
+        root = workdir / f"tasks-{rows}"
+        seed_tasks(root / "data" / "tasks.db", rows)
+        pristine = root / "pristine.db"
+        shutil.copy(root / "data" / "tasks.db", pristine)
+        point_at(session_status, root)
+        results[f"tasks.summary.{rows}rows"] = timed(session_status.get_task_summary, 30)
+
+        # Through main(), starting from an unprepared database as a user first would
+        shutil.copy(pristine, root / "data" / "tasks.db")
+        start = time.perf_counter()
+        first = briefing(["--refresh"])
+        first_elapsed = time.perf_counter() - start
+        wait_for_tasks_index(root / "data" / "tasks.db")
+        samples, unavailable = [first_elapsed], int(first["tasks"] is None)
+        for _ in range(10):
+            start = time.perf_counter()
+            status = briefing(["--refresh"])
+            samples.append(time.perf_counter() - start)
+            unavailable += status["tasks"] is None
+        results[f"tasks.status.{rows}rows"] = summarize(samples, tasks_unavailable=unavailable)
+    return results
+
+
+def tasks_unavailable(results: dict) -> list:
+    """Messages for briefings that came back without a task summary."""
+    return [f"{name}: tasks section unavailable in {row['tasks_unavailable']} of {row['n']} briefings"
+            for name, row in results["scenarios"].items() if row.get("tasks_unavailable")]
+
+
+def bench_recall(quick: bool, workdir: Path) -> dict:
+    results = {}
+    for log_count in ([365] if quick else [365, 3 * 365]):
+        root = make_project(workdir / f"recall-{log_count}", log_count, rng=random.Random(13))
+        db_path = root / "data" / "memory_index.db"
+        logs_dir = root / "memory" / "logs"
+        memory_index.rebuild(root / "memory" / "MEMORY.md", logs_dir, db_path)
+
+        for label, terms in (("common", ["billing", "deploy"]), ("rare", ["ticket4242"])):
+            query = memory_index.fts_query(terms)
+            results[f"recall.search.{label}.{log_count}logs"] = timed(
+                lambda: memory_index.search(query, 10, db_path), 50)
+
+        newest = max(logs_dir.glob("*.md"))
+
+        def append_and_index():
+            with open(newest, "a", encoding="utf-8") as f:
+                f.write("- [23:59] Session activity captured\n")
+            memory_index.update([newest], root / "memory" / "MEMORY.md", logs_dir, db_path)
+
+        results[f"recall.update.{log_count}logs"] = timed(append_and_index, 50)
+    return results
+
+
+def imported_modules(script: Path, stdin_text: str, env: dict) -> set:
+    """Modules a fresh interpreter imports running the script, via -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(script)], input=stdin_text.encode("utf-8"),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    return {line.rsplit("|", 1)[-1].strip() for line in proc.stderr.decode("utf-8", "replace").splitlines()
+            if line.startswith("import time:")}
+
+
+def bench_telemetry(quick: bool, workdir: Path) -> dict:
+    commands = make_commands(2_000 if quick else 10_000)
+    inputs = [hook_payload(tool_input={"command": command}) for command in commands]
+    saved = hook_probe.ENABLED, telemetry.STORE_PATH
+    try:
+        hook_probe.ENABLED = False
+        off = warm(guardrail_check, inputs)
+        hook_probe.ENABLED, telemetry.STORE_PATH = True, workdir / "telemetry.ring"
+        on = warm(guardrail_check, inputs)
+    finally:
+        hook_probe.ENABLED, telemetry.STORE_PATH = saved
+
+    script = HOOKS_DIR / "guardrail_check.py"
+    env_off = {name: value for name, value in os.environ.items() if name != "DSF_HOOK_TELEMETRY"}
+    env_on = dict(env_off, DSF_HOOK_TELEMETRY="1", DSF_HOOK_TELEMETRY_PATH=str(workdir / "telemetry-cold.ring"))
+    cold_inputs = inputs[:10 if quick else 30]
+    cold_off = cold(script, cold_inputs, env_off)
+    cold_off["recorder_modules"] = sorted(imported_modules(script, inputs[0], env_off) & set(RECORDER_MODULES))
+    return {
+        "telemetry.off.guardrail": off,
+        "telemetry.on.guardrail": on,
+        "telemetry.cold.off.guardrail": cold_off,
+        "telemetry.cold.on.guardrail": cold(script, cold_inputs, env_on),
+    }
+
+
+def telemetry_overhead(results: dict) -> list:
+    """Messages for a telemetry run whose recording cost exceeds the budget."""
+    off = results["scenarios"].get("telemetry.off.guardrail")
+    on = results["scenarios"].get("telemetry.on.guardrail")
+    if not off or not on:
+        return []
+    overhead = on["p50_ms"] - off["p50_ms"]
+    if overhead <= telemetry.OVERHEAD_BUDGET_MS:
+        return []
+    return [f"telemetry: recording adds {overhead:.3f} ms at p50 "
+            f"(budget {telemetry.OVERHEAD_BUDGET_MS:.3f} ms)"]
+
+
+def telemetry_cold_imports(results: dict) -> list:
+    """Messages for a cold hook that loaded the recorder with telemetry off."""
+    return [f"{name}: telemetry off but a cold hook imported {', '.join(row['recorder_modules'])}"
+            for name, row in results["scenarios"].items() if row.get("recorder_modules")]
+
+
+SUITES = {
+    "guardrail": bench_guardrail,
+    "validate": bench_validate,
+    "memory": bench_memory,
+    "status": bench_status,
+    "tasks": bench_tasks,
+    "recall": bench_recall,
+    "telemetry": bench_telemetry,
+}
+
+
+def run_suites(names: list, quick: bool) -> dict:
+    scenarios = {}
+    with tempfile.TemporaryDirectory(prefix="dsf-bench-") as tmp:
+        for name in names:
+            print(f"Running {name}...", file=sys.stderr)
+            scenarios.update(SUITES[name](quick, Path(tmp)))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "suites": names,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Return a list of regression messages (empty = pass)."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        limit = before["p95_ms"] * (1 + tolerance) + ABSOLUTE_SLACK_MS
+        if now["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {now['p95_ms']:.3f} ms > {limit:.3f} ms "
+                f"(baseline {before['p95_ms']:.3f} ms, tolerance {tolerance:.0%})")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'scenario':<40} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak KB':>10}",
+          file=sys.stderr)
+    for name, row in results["scenarios"].items():
+        peak = row.get("peak_rss_kb", row.get("peak_alloc_kb", 0))
+        print(f"{name:<40} {row['n']:>6} {row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f} "
+              f"{row['p99_ms']:>10.3f} {peak:>10}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hook latency benchmarks")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="Suite(s) to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller corpora for a fast check")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT,
+                        help="Where to write results (default: %(default)s)")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE",
+                        help="Compare against a baseline file; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed fractional p95 growth (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        names = args.suite or [name for name in baseline["meta"]["suites"] if name in SUITES]
+        results = run_suites(names, baseline["meta"].get("quick", False))
+        print_table(results)
+        regressions = (compare(baseline, results, args.tolerance) + telemetry_overhead(results)
+                       + telemetry_cold_imports(results) + tasks_unavailable(results)
+                       + stream_memory(results) + cold_import_time(results))
+        print(json.dumps({"regressions": regressions, "passed": not regressions}, indent=2))
+        sys.exit(1 if regressions else 0)
+
+    results = run_suites(args.suite or list(SUITES), args.quick)
+    print_table(results)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Wrote {args.output}", file=sys.stderr)
+    over_budget = (telemetry_overhead(results) + telemetry_cold_imports(results)
+                   + tasks_unavailable(results) + stream_memory(results) + cold_import_time(results))
+    for message in over_budget:
+        print(message, file=sys.stderr)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Tool: Guardrail Batch Audit
+Purpose: Replay historical commands through guardrail rule sets.
+Usage:
+    python3 hooks/guardrail_audit.py INPUT... [--rules FILE] [--compare FILE]
+        [--format auto|jsonl|history] [--workers N] [--samples 5] [--json]
+    python3 hooks/guardrail_audit.py --dump-rules > rules.json
+
+INPUT is a JSON Lines file (hook payloads, Claude Code transcripts, or
+objects with a "command" key) or a shell history file (bash, zsh extended
+history, fish), optionally gzipped; "-" reads stdin.
+
+Reports how many commands each rule trips, with sample matches (rules that
+never fire are listed too). With --compare, it also diffs verdicts between
+the two rule sets: newly blocked, newly allowed, and blocked for a different
+rule. Rule sets are JSON ({"blocked_patterns": [{"pattern", "label"}],
+"protected_files": [...]}); the default is guardrail_check's live rules,
+and --dump-rules prints them in that format as a starting point.
+
+Input is streamed in ~1 MB batches to a process pool with a bounded number
+of batches in flight, so memory stays flat on multi-gigabyte inputs and
+throughput scales with cores. Workers do the JSON parsing as well as the
+rule checks; the parent only splits lines.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from guardrail_engine import RuleEngine
+
+# Bytes of input per batch sent to a worker
+BATCH_BYTES = 1024 * 1024
+
+# Batches in flight per worker (bounds memory)
+INFLIGHT_PER_WORKER = 2
+
+# Per-worker cache of rule matches; shell histories repeat commands a lot
+AUDIT_CACHE_SIZE = 65536
+
+SAMPLE_LENGTH = 200
+
+_ZSH_EXTENDED = re.compile(r"^: \d+:\d+;")
+
+# Worker state, built once per process by init_worker
+_ENGINES = ()
+_SAMPLES = 5
+
+
+# --- Rule sets ---------------------------------------------------------------
+
+def current_rules() -> dict:
+    """guardrail_check's live rules in rule-set JSON form."""
+    import guardrail_check
+
+    return {
+        "blocked_patterns": [{"pattern": regex.pattern, "label": label}
+                             for regex, label in guardrail_check.BLOCKED_PATTERNS],
+        "protected_files": list(guardrail_check.PROTECTED_FILES),
+    }
+
+
+def load_rules(path) -> dict:
+    """Read a rule-set JSON file (None = the live rules), validating its regexes."""
+    if path is None:
+        return current_rules()
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    for rule in rules.get("blocked_patterns", []):
+        try:
+            re.compile(rule["pattern"])
+        except (re.error, KeyError, TypeError) as e:
+            raise ValueError(f"{path}: bad blocked pattern {rule!r}: {e}")
+    return {
+        "blocked_patterns": [{"pattern": rule["pattern"], "label": rule.get("label", rule["pattern"])}
+                             for rule in rules.get("blocked_patterns", [])],
+        "protected_files": [str(name) for name in rules.get("protected_files", [])],
+    }
+
+
+def build_engine(rules: dict) -> RuleEngine:
+    return RuleEngine([(re.compile(rule["pattern"]), rule["label"]) for rule in rules["blocked_patterns"]],
+                      rules["protected_files"])
+
+
+def rule_names(rules: dict) -> list:
+    return ([f"pattern: {rule['label']}" for rule in rules["blocked_patterns"]]
+            + [f"protected: {name}" for name in rules["protected_files"]])
+
+
+def hit_name(hit: tuple) -> str:
+    return f"{hit[0]}: {hit[1]}"
+
+
+# --- Input -------------------------------------------------------------------
+
+def open_input(path: str):
+    """Binary stream for a path ("-" = stdin), transparently gunzipping .gz files."""
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def detect_format(path: str, stream) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".json", ".ndjson")):
+        return "jsonl"
+    if hasattr(stream, "peek"):
+        head = stream.peek(4096).lstrip()
+        if head.startswith(b"{"):
+            return "jsonl"
+    return "history"
+
+
+def history_commands(lines):
+    """Commands from bash, zsh (plain or extended) or fish history lines."""
+    pending = []
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace").rstrip("\n")
+        if not pending:
+            if line.startswith("#") and line[1:].isdigit():
+                continue  # bash HISTTIMEFORMAT stamp
+            if line.startswith("- cmd: "):
+                line = line[7:].replace("\\n", "\n")  # fish
+            elif line.startswith("  when: ") or line.startswith("  paths:") or line.startswith("    - "):
+                continue  # fish metadata
+            else:
+                line = _ZSH_EXTENDED.sub("", line)
+        if line.endswith("\\"):
+            pending.append(line[:-1])  # Continued on the next line (zsh multi-line)
+            continue
+        pending.append(line)
+        command = "\n".join(pending).strip()
+        pending = []
+        if command:
+            yield command
+    if pending:
+        command = "\n".join(pending).strip()
+        if command:
+            yield command
+
+
+def batches(path: str, input_format: str):
+    """Yield ("jsonl", [raw lines]) or ("commands", [commands]) batches of ~BATCH_BYTES."""
+    with open_input(path) as stream:
+        kind = detect_format(path, stream) if input_format == "auto" else input_format
+        items = stream if kind == "jsonl" else history_commands(stream)
+        batch, size = [], 0
+        for item in items:
+            if kind == "jsonl" and b'"command"' not in item:
+                continue  # Cheap skip: nothing in this line can carry a command
+            batch.append(item)
+            size += len(item)
+            if size >= BATCH_BYTES:
+                yield ("jsonl" if kind == "jsonl" else "commands"), batch
+                batch, size = [], 0
+        if batch:
+            yield ("jsonl" if kind == "jsonl" else "commands"), batch
+
+
+def event_commands(event) -> list:
+    """Shell commands in one JSONL record: a hook payload, a transcript event, or {"command": ...}."""
+    if not isinstance(event, dict):
+        return []
+    tool_input = event.get("tool_input")
+    if isinstance(tool_input, dict) and isinstance(tool_input.get("command"), str):
+        return [tool_input["command"]]
+    message = event.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    if isinstance(content, list):
+        return [block["input"]["command"] for block in content
+                if isinstance(block, dict) and block.get("type") == "tool_use"
+                and isinstance(block.get("input"), dict)
+                and isinstance(block["input"].get("command"), str)]
+    if isinstance(event.get("command"), str):
+        return [event["command"]]
+    return []
+
+
+# --- Workers -----------------------------------------------------------------
+
+def init_worker(rule_sets: list, samples: int):
+    global _ENGINES, _SAMPLES
+    # Each engine as its cached matching_rules(command) -> [(kind, name), ...]
+    _ENGINES = tuple(lru_cache(maxsize=AUDIT_CACHE_SIZE)(build_engine(rules).matching_rules)
+                     for rules in rule_sets)
+    _SAMPLES = samples
+
+
+def new_tally() -> dict:
+    return {"commands": 0, "blocked": 0, "unparsed": 0, "hits": Counter(), "samples": {},
+            "diff": Counter(), "diff_samples": {}}
+
+
+def add_sample(samples: dict, key: str, text: str, limit: int):
+    bucket = samples.setdefault(key, [])
+    if len(bucket) < limit:
+        bucket.append(text if len(text) <= SAMPLE_LENGTH else text[:SAMPLE_LENGTH - 1] + "…")
+
+
+def audit_batch(kind: str, items: list) -> dict:
+    """Check one batch against the worker's rule sets. Returns a tally."""
+    tally = new_tally()
+    if kind == "jsonl":
+        commands = []
+        for line in items:
+            try:
+                commands.extend(event_commands(json.loads(line)))
+            except ValueError:
+                tally["unparsed"] += 1
+    else:
+        commands = items
+
+    primary = _ENGINES[0]
+    other = _ENGINES[1] if len(_ENGINES) > 1 else None
+    for command in commands:
+        tally["commands"] += 1
+        hits = primary(command)
+        if hits:
+            tally["blocked"] += 1
+            for hit in hits:
+                name = hit_name(hit)
+                tally["hits"][name] += 1
+                add_sample(tally["samples"], name, command, _SAMPLES)
+        if other is not None:
+            other_hits = other(command)
+            before = hit_name(hits[0]) if hits else None
+            after = hit_name(other_hits[0]) if other_hits else None
+            if before != after:
+                change = ("newly_blocked" if before is None else
+                          "newly_allowed" if after is None else "rule_changed")
+                tally["diff"][change] += 1
+                label = command if change != "rule_changed" else f"{before} -> {after}: {command}"
+                add_sample(tally["diff_samples"], change, label, _SAMPLES)
+    return tally
+
+
+def merge(total: dict, tally: dict, samples: int):
+    for key in ("commands", "blocked", "unparsed"):
+        total[key] += tally[key]
+    total["hits"].update(tally["hits"])
+    total["diff"].update(tally["diff"])
+    for field in ("samples", "diff_samples"):
+        for key, texts in tally[field].items():
+            for text in texts:
+                add_sample(total[field], key, text, samples)
+
+
+# --- Driver ------------------------------------------------------------------
+
+def audit(paths: list, rule_sets: list, workers: int = None, samples: int = 5,
+          input_format: str = "auto") -> dict:
+    """Stream every input through the rule sets. Returns the merged tally."""
+    workers = workers or os.cpu_count() or 1
+    total = new_tally()
+    work = (batch for path in paths for batch in batches(path, input_format))
+
+    if workers == 1:
+        init_worker(rule_sets, samples)
+        for kind, items in work:
+            merge(total, audit_batch(kind, items), samples)
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(rule_sets, samples)) as pool:
+        # Merged oldest-first, so samples come out in input order
+        pending = deque()
+        for kind, items in work:
+            pending.append(pool.submit(audit_batch, kind, items))
+            if len(pending) >= workers * INFLIGHT_PER_WORKER:
+                merge(total, pending.popleft().result(), samples)
+        while pending:
+            merge(total, pending.popleft().result(), samples)
+    return total
+
+
+def build_report(total: dict, rules: dict, compare_rules: dict = None) -> dict:
+    report = {
+        "commands": total["commands"],
+        "blocked": total["blocked"],
+        "unparsed_lines": total["unparsed"],
+        "rules": {name: {"hits": total["hits"][name], "samples": total["samples"].get(name, [])}
+                  for name in rule_names(rules)},
+    }
+    if compare_rules is not None:
+        report["diff"] = {
+            change: {"count": total["diff"][change], "samples": total["diff_samples"].get(change, [])}
+            for change in ("newly_blocked", "newly_allowed", "rule_changed")
+        }
+    return report
+
+
+def one_line(text: str) -> str:
+    return text.replace("\n", "\\n")
+
+
+def print_report(report: dict):
+    print(f"{report['commands']} commands, {report['blocked']} blocked"
+          + (f", {report['unparsed_lines']} unparsable lines" if report["unparsed_lines"] else ""))
+    print("\nRule hits:")
+    for name, rule in sorted(report["rules"].items(), key=lambda item: -item[1]["hits"]):
+        print(f"  {rule['hits']:>10}  {name}")
+        for sample in rule["samples"]:
+            print(f"              {one_line(sample)}")
+    if "diff" in report:
+        print("\nVerdict changes (--rules -> --compare):")
+        for change, entry in report["diff"].items():
+            print(f"  {entry['count']:>10}  {change.replace('_', ' ')}")
+            for sample in entry["samples"]:
+                print(f"              {one_line(sample)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay historical commands through guardrail rules")
+    parser.add_argument("inputs", nargs="*", help="JSONL or shell history files (.gz ok, - for stdin)")
+    parser.add_argument("--rules", help="Rule-set JSON to audit (default: guardrail_check's rules)")
+    parser.add_argument("--compare", help="Second rule-set JSON to diff verdicts against")
+    parser.add_argument("--format", choices=("auto", "jsonl", "history"), default="auto")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--samples", type=int, default=5, help="Sample commands kept per rule")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--dump-rules", action="store_true", help="Print the live rules as rule-set JSON")
+    args = parser.parse_args(argv)
+
+    if args.dump_rules:
+        print(json.dumps(current_rules(), indent=2))
+        return
+    if not args.inputs:
+        parser.error("at least one input is required")
+
+    try:
+        rules = load_rules(args.rules)
+        compare_rules = load_rules(args.compare) if args.compare else None
+    except (OSError, ValueError) as e:
+        print(f"Cannot load rules: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rule_sets = [rules] + ([compare_rules] if compare_rules else [])
+    total = audit(args.inputs, rule_sets, args.workers, args.samples, args.format)
+    report = build_report(total, rules, compare_rules)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
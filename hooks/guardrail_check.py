@@ -12,6 +12,9 @@ import json
 import re
 import sys
 
+import hook_probe
+from guardrail_engine import RuleEngine
+
 # Regex patterns for dangerous commands — handles whitespace variants, flag
 # reordering, and case variations that simple substring matching would miss.
 # Each tuple: (compiled regex, human-readable label for error messages)
@@ -49,63 +52,68 @@ CAUTION_PATTERNS = [
 ]
 
 
+# Compiled once per process; the hook server reuses it (and its verdict cache)
+ENGINE = RuleEngine(BLOCKED_PATTERNS, PROTECTED_FILES)
+
+
 def check_command(command: str) -> dict:
     """Check a command against guardrails. Returns {allow: bool, reason: str}."""
-    cmd_lower = command.lower().strip()
-
-    # Check blocked patterns
-    for regex, label in BLOCKED_PATTERNS:
-        if regex.search(cmd_lower):
-            return {
-                "allow": False,
-                "reason": f"BLOCKED: Command contains dangerous pattern '{label}'. "
-                         f"This is blocked by guardrail rules. If you need to do this, "
-                         f"ask the user for explicit confirmation first."
-            }
-
-    # Check protected files for deletion
-    for protected in PROTECTED_FILES:
-        if protected in command and ("rm " in cmd_lower or "delete" in cmd_lower):
-            return {
-                "allow": False,
-                "reason": f"BLOCKED: Cannot delete protected file '{protected}'. "
-                         f"This file is critical to the system."
-            }
-
-    # Allow the command
-    return {"allow": True, "reason": ""}
+    return ENGINE.check(command)
 
 
-def main():
-    """Read hook input from stdin, check the command, exit appropriately."""
-    try:
-        hook_input = sys.stdin.read()
-        if not hook_input:
-            sys.exit(0)  # No input = allow
+def evaluate(hook_input: str, probe=hook_probe.NULL_PROBE) -> tuple:
+    """Evaluate raw hook input. Returns (exit_code, output) for the hook."""
+    probe.payload_bytes = len(hook_input)
+    if not hook_input:
+        return 0, ""  # No input = allow
 
-        data = json.loads(hook_input)
-        tool_input = data.get("tool_input", {})
+    try:
+        with probe.phase("parse"):
+            data = json.loads(hook_input)
+            tool_input = data.get("tool_input", {})
 
-        # Extract the command being run
-        command = tool_input.get("command", "")
+            # Extract the command being run
+            command = tool_input.get("command", "")
         if not command:
-            sys.exit(0)  # No command = allow
+            return 0, ""  # No command = allow
+
+        probe.detail = command
+        with probe.phase("check"):
+            result = check_command(command)
+
+    except json.JSONDecodeError as e:
+        probe.swallowed(e)
+        return 0, ""  # Can't parse = allow (don't break things)
+    except Exception as e:
+        probe.swallowed(e)
+        return 0, ""  # Any error = allow (hooks shouldn't block on errors)
 
-        result = check_command(command)
+    if not result["allow"]:
+        # Exit code 2 = block the tool use
+        # The reason is printed so Claude sees it
+        return 2, result["reason"]
 
-        if not result["allow"]:
-            # Exit code 2 = block the tool use
-            # Print the reason so Claude sees it
-            print(result["reason"])
-            sys.exit(2)
+    # Exit code 0 = allow
+    return 0, ""
 
-        # Exit code 0 = allow
-        sys.exit(0)
 
-    except json.JSONDecodeError:
-        sys.exit(0)  # Can't parse = allow (don't break things)
-    except Exception:
-        sys.exit(0)  # Any error = allow (hooks shouldn't block on errors)
+def main():
+    """Read hook input from stdin, check the command, exit appropriately."""
+    probe = hook_probe.probe("guardrail_check")
+    try:
+        with probe.phase("read"):
+            hook_input = sys.stdin.read()
+        exit_code, output = evaluate(hook_input, probe)
+        if output:
+            with probe.phase("io"):
+                print(output)
+
+    except Exception as e:
+        probe.swallowed(e)
+        exit_code = 0  # Any error = allow (hooks shouldn't block on errors)
+
+    probe.finish(exit_code)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""
+Module: Guardrail Rule Engine
+Purpose: Evaluate shell commands against guardrail rules in a single pass.
+Used by: hooks/guardrail_check.py (and anything that needs to replay rule sets)
+
+Blocked patterns are compiled into one alternation, so an allowed command
+costs one regex scan no matter how many rules a guardrail pack adds. Protected
+filenames are matched the same way. Only when something hits do we walk the
+rules in order to report the same label the sequential checks would have.
+Verdicts are cached per command in a bounded LRU.
+
+A pattern only joins the alternation if it means the same thing there:
+no capturing groups (backreferences would be renumbered) and no flags of
+its own (an inline "(?i)" can't sit mid-pattern). The rest are scanned
+one by one, as is everything if the alternation fails to compile.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+# Commands that delete their file arguments
+DELETE_COMMANDS = frozenset({"rm", "unlink"})
+
+# Words that run the command after them (`sudo rm`, `xargs rm`, ...)
+COMMAND_WRAPPERS = frozenset({"sudo", "command", "env", "exec", "nohup", "time", "xargs"})
+
+_ASSIGNMENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*=")
+
+# Flags a plain str pattern compiles with
+_DEFAULT_FLAGS = re.compile("").flags
+
+# Commands longer than this are evaluated but never cached
+MAX_CACHED_COMMAND_LENGTH = 4096
+
+# Quote-aware shell tokenizer: quoted strings and escapes are kept intact,
+# group 1 captures the operators that separate commands (; & | && || newline)
+_SEGMENT_TOKEN = re.compile(
+    r"""'[^']*'?|"(?:\\.|[^"\\])*"?|\\.?|(\|\||&&|[;&|\n])|[^'"\\;&|\n]+""",
+    re.DOTALL,
+)
+
+
+def split_segments(command: str) -> list:
+    """Split a compound/piped command into its simple-command segments."""
+    segments = []
+    start = 0
+    for match in _SEGMENT_TOKEN.finditer(command):
+        if match.group(1):
+            segments.append(command[start:match.start()].strip())
+            start = match.end()
+    segments.append(command[start:].strip())
+    return [segment for segment in segments if segment]
+
+
+def segment_words(segment: str) -> list:
+    """Return the words of a segment with quotes and escapes removed."""
+    return [word.strip("'\"").lstrip("\\") for word in segment.split()]
+
+
+def command_word(segment: str) -> str:
+    """The program a simple command runs, past env assignments and wrappers like sudo."""
+    wrapped = False
+    for word in segment_words(segment):
+        word = word.lstrip("({")
+        if not word or _ASSIGNMENT.match(word) or (wrapped and word.startswith("-")):
+            continue  # VAR=value, or an option of the wrapper
+        name = os.path.basename(word)
+        if name in COMMAND_WRAPPERS:
+            wrapped = True
+            continue
+        return name
+    return ""
+
+
+def _alternation(patterns: list):
+    """Compile patterns into one regex, or None when there are none (or it won't compile)."""
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    except (re.error, RecursionError, OverflowError):
+        return None
+
+
+def _combinable(regex) -> bool:
+    """True if the pattern behaves the same inside a bigger alternation."""
+    return isinstance(regex.pattern, str) and regex.groups == 0 and regex.flags == _DEFAULT_FLAGS
+
+
+class RuleEngine:
+    """Compiled guardrail rule set with a verdict cache."""
+
+    def __init__(self, blocked_patterns, protected_files, cache_size: int = 1024):
+        self.blocked_patterns = list(blocked_patterns)
+        self.protected_files = list(protected_files)
+
+        combined = [regex for regex, _ in self.blocked_patterns if _combinable(regex)]
+        self._blocked_any = _alternation([regex.pattern for regex in combined])
+        if self._blocked_any is None:
+            combined = []
+        # Patterns with their own groups or flags are scanned one by one
+        self._blocked_rest = [regex for regex, _ in self.blocked_patterns if regex not in combined]
+        self._protected_any = _alternation([re.escape(name) for name in self.protected_files])
+        self._cached_evaluate = lru_cache(maxsize=cache_size)(self._evaluate)
+
+    def check(self, command: str) -> dict:
+        """Check a command against guardrails. Returns {allow: bool, reason: str}."""
+        if len(command) > MAX_CACHED_COMMAND_LENGTH:
+            return dict(self._evaluate(command))
+        return dict(self._cached_evaluate(command))
+
+    def cache_info(self):
+        """Expose LRU hit/miss counters (for benchmarks and the hook server)."""
+        return self._cached_evaluate.cache_info()
+
+    def blocked_hit(self, cmd_lower: str) -> bool:
+        """True if any blocked pattern matches (cheap pre-check before the ordered walk)."""
+        if self._blocked_any is not None and self._blocked_any.search(cmd_lower):
+            return True
+        return any(regex.search(cmd_lower) for regex in self._blocked_rest)
+
+    def deletes_files(self, command: str, cmd_lower: str) -> bool:
+        """Return True if any segment of the command deletes files."""
+        if "rm " in cmd_lower or "delete" in cmd_lower:
+            return True
+        return any(command_word(segment) in DELETE_COMMANDS for segment in split_segments(command))
+
+    def matching_rules(self, command: str) -> list:
+        """Every rule the command trips, in the order check() walks them.
+
+        Entries are ("pattern", label) or ("protected", filename); the first
+        one is the rule check() reports. Empty means the command is allowed.
+        """
+        cmd_lower = command.lower().strip()
+        hits = []
+        if self.blocked_hit(cmd_lower):
+            hits.extend(("pattern", label) for regex, label in self.blocked_patterns
+                        if regex.search(cmd_lower))
+        if (self._protected_any is not None
+                and self._protected_any.search(command)
+                and self.deletes_files(command, cmd_lower)):
+            hits.extend(("protected", name) for name in self.protected_files if name in command)
+        return hits
+
+    def _evaluate(self, command: str) -> dict:
+        cmd_lower = command.lower().strip()
+
+        # Check blocked patterns — one combined scan, ordered walk only on a hit
+        if self.blocked_hit(cmd_lower):
+            for regex, label in self.blocked_patterns:
+                if regex.search(cmd_lower):
+                    return {
+                        "allow": False,
+                        "reason": f"BLOCKED: Command contains dangerous pattern '{label}'. "
+                                 f"This is blocked by guardrail rules. If you need to do this, "
+                                 f"ask the user for explicit confirmation first."
+                    }
+
+        # Check protected files for deletion
+        if (self._protected_any is not None
+                and self._protected_any.search(command)
+                and self.deletes_files(command, cmd_lower)):
+            for protected in self.protected_files:
+                if protected in command:
+                    return {
+                        "allow": False,
+                        "reason": f"BLOCKED: Cannot delete protected file '{protected}'. "
+                                 f"This file is critical to the system."
+                    }
+
+        # Allow the command
+        return {"allow": True, "reason": ""}
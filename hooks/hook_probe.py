@@ -0,0 +1,55 @@
+"""
+Hook probes: what every hook imports to time itself (see telemetry.py).
+
+Kept tiny on purpose — it is on every cold hook invocation's import path.
+With DSF_HOOK_TELEMETRY unset it imports nothing but os and hands out
+NULL_PROBE; the recorder (telemetry.py and its imports) is loaded only
+when recording is on.
+"""
+
+import os
+
+ENABLED = os.environ.get("DSF_HOOK_TELEMETRY", "") not in ("", "0") and hasattr(os, "pwrite")
+
+
+class _NullContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProbe:
+    """Stand-in when telemetry is off: same interface as telemetry.Probe, does nothing."""
+
+    hook = ""
+    served = False
+    payload_bytes = 0
+    error = ""
+    detail = ""
+    _context = _NullContext()
+
+    def __setattr__(self, name, value):
+        pass  # Hooks set payload_bytes/detail unconditionally
+
+    def phase(self, name: str):
+        return self._context
+
+    def swallowed(self, exc: BaseException):
+        pass
+
+    def finish(self, exit_code: int):
+        pass
+
+
+NULL_PROBE = NullProbe()
+
+
+def probe(hook: str, served: bool = False):
+    """A telemetry.Probe for this invocation, or NULL_PROBE if telemetry is off."""
+    if not ENABLED:
+        return NULL_PROBE
+    import telemetry
+
+    return telemetry.Probe(hook, served)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tool: Hook Server
+Purpose: Keep PreToolUse/PostToolUse hook logic warm in one long-lived process.
+Usage: python3 hooks/hook_server.py [--socket PATH]
+
+Listens on a Unix domain socket (default .tmp/hooks.sock, or $DSF_HOOK_SOCKET).
+hooks/hook_client.py sends the hook name and a newline, then streams the
+hook's stdin until EOF; the reply is the exit code and a newline, then the
+output. Input is evaluated as it arrives (validate_output streams large
+input), so a request never has to fit in memory. The server is optional:
+the client falls back to in-process evaluation whenever it cannot reach it.
+"""
+
+import argparse
+import io
+import os
+import signal
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+import guardrail_check
+import hook_probe
+import validate_output
+from hook_client import SERVED_HOOKS, SOCKET_PATH, evaluate
+
+# Imported here so they are warm; hook_client.evaluate runs them
+WARM_HOOKS = (guardrail_check, validate_output)
+
+# Longest first line a client may send (the hook name)
+MAX_HEADER = 256
+
+
+class HookRequestHandler(socketserver.StreamRequestHandler):
+    """Read one request, evaluating the input as it streams in; write one reply."""
+
+    def handle(self):
+        hook = self.rfile.readline(MAX_HEADER).decode("ascii", errors="replace").strip()
+        if hook not in SERVED_HOOKS:
+            return  # Closing without a reply makes the client run locally
+
+        stream = io.TextIOWrapper(self.rfile, encoding="utf-8")
+        try:
+            probe = hook_probe.probe(hook, served=True)
+            exit_code, output = evaluate(hook, stream, probe)
+            probe.finish(exit_code)
+        finally:
+            stream.detach()  # The handler closes rfile itself
+        self.wfile.write(f"{exit_code}\n{output}".encode("utf-8"))
+
+
+class HookServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def socket_in_use(path: Path) -> bool:
+    """Return True if another server is already answering on this socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def serve(path: Path):
+    """Bind the socket (owner-only) and serve until interrupted."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if socket_in_use(path):
+            print(f"Hook server already running on {path}", file=sys.stderr)
+            sys.exit(1)
+        path.unlink()  # Stale socket from a previous run
+
+    old_umask = os.umask(0o177)
+    try:
+        server = HookServer(str(path), HookRequestHandler)
+    finally:
+        os.umask(old_umask)
+
+    # Treat SIGTERM like Ctrl-C so the socket file is removed on shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm hook server")
+    parser.add_argument("--socket", type=Path, default=Path(SOCKET_PATH),
+                        help="Unix socket path (default: %(default)s)")
+    args = parser.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Module: Streaming JSON Scanner
+Purpose: Check JSON well-formedness incrementally, in bounded memory.
+Used by: hooks/validate_output.py
+
+Text is fed in chunks; only the container stack, an incomplete trailing token
+and a few small captures are kept between chunks. Besides validating, the
+scanner can:
+  - capture the raw text of chosen top-level keys (e.g. "success", "error"),
+  - stream the decoded string value of one top-level key to a sink, piece by
+    piece (how the hook payload's "tool_output" reaches the inner scanner),
+  - accept newline-separated top-level values (JSON Lines), reporting each
+    record through on_record and resynchronising on the next line after a
+    bad one.
+
+Error messages follow the json module's "<msg>: line L column C (char N)".
+Like json.loads, NaN/Infinity/-Infinity are accepted as numbers.
+"""
+
+import json
+import re
+
+# Parser states
+VALUE, ARRAY_FIRST, OBJECT_FIRST, KEY, COLON, AFTER_VALUE, END, SKIP_LINE = range(8)
+
+MAX_DEPTH = 10_000
+MAX_KEY_LENGTH = 256
+
+# re keeps backtracking state for every repetition of a group, so a match
+# running over megabytes costs many times their size in memory. Matches are
+# confined to windows: string bodies are taken STRING_WINDOW chars at a time,
+# and the whole-value fast paths only try values that fit in FAST_WINDOW.
+# STRING_WINDOW must hold a surrogate pair escape (12 chars).
+STRING_WINDOW = 64 * 1024
+FAST_WINDOW = 4096
+
+_WS = re.compile(r"[ \t\n\r]*")
+# A run of string body: plain characters and complete escapes
+_STRING_RUN = re.compile(r'(?:[^"\\\x00-\x1f]+|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*')
+_HIGH_SURROGATE = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+_EXPECTING = {
+    OBJECT_FIRST: "Expecting property name enclosed in double quotes",
+    KEY: "Expecting property name enclosed in double quotes",
+    COLON: "Expecting ':' delimiter",
+    AFTER_VALUE: "Expecting ',' delimiter",
+}
+
+# Whole small values in one regex match: scalars, flat containers, and
+# containers of those. Used for values nobody needs events from.
+_WS_RE = r"[ \t\n\r]*"
+_STRING_RE = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_SCALAR_RE = rf"(?:{_STRING_RE}|true|false|null|NaN|-?Infinity|-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+
+
+def _containers(item: str) -> str:
+    array = rf"\[{_WS_RE}(?:{item}{_WS_RE}(?:,{_WS_RE}{item}{_WS_RE})*)?\]"
+    member = rf"{_STRING_RE}{_WS_RE}:{_WS_RE}{item}"
+    obj = rf"\{{{_WS_RE}(?:{member}{_WS_RE}(?:,{_WS_RE}{member}{_WS_RE})*)?\}}"
+    return f"{array}|{obj}"
+
+
+_FLAT_RE = f"(?:{_SCALAR_RE}|{_containers(_SCALAR_RE)})"
+_FAST_CONTAINER = re.compile(_containers(_FLAT_RE))
+_FAST_STRING = re.compile(_STRING_RE)
+
+# Runs of further items (", item" / ', "key": item') inside a container, each
+# one complete — the lookahead rejects a number the window or chunk cut short
+_ITEM_RE = rf"(?:{_containers(_FLAT_RE)}|{_FLAT_RE})(?={_WS_RE}[,\]}}])"
+_ARRAY_RUN = re.compile(rf"(?:{_WS_RE},{_WS_RE}{_ITEM_RE})*")
+_MEMBER_RUN = re.compile(rf"(?:{_WS_RE},{_WS_RE}{_STRING_RE}{_WS_RE}:{_WS_RE}{_ITEM_RE})*")
+
+
+def _ends_with_high_surrogate(buf: str, start: int, end: int) -> bool:
+    """True if buf[start:end] ends with a \\uD800-\\uDBFF escape (not an escaped backslash + "u...")."""
+    if end - start < 6 or not _HIGH_SURROGATE.match(buf, end - 6, end):
+        return False
+    i = end - 7
+    while i >= start and buf[i] == "\\":
+        i -= 1
+    return (end - 7 - i) % 2 == 0
+
+
+class JsonStreamScanner:
+    """Incremental JSON validator. Call feed() with chunks, then close()."""
+
+    def __init__(self, multi: bool = False, capture_keys=(), capture_limit: int = 4096,
+                 stream_key: str = None, stream_sink=None, on_record=None):
+        self.multi = multi
+        self.capture_keys = frozenset(capture_keys)
+        self.capture_limit = capture_limit
+        self.stream_key = stream_key
+        self.stream_sink = stream_sink  # has begin(is_string), write(text), finish()
+        self.on_record = on_record      # called as on_record(line, captured, error)
+
+        self.error = None       # fatal error message (stream is not valid JSON)
+        self.records = 0        # top-level values seen
+        self.jsonl = False      # True once a second newline-separated value appears
+        self.done = False
+
+        self._state = VALUE
+        self._stack = []
+        self._pending = ""
+        self._in_string = False
+        self._string_role = None   # "key", "stream" or "value"
+        self._string_start = None  # (line, column, char) of the open quote
+        self._key_parts = []
+        self._key_length = 0
+        self._key = None
+        self._saw_newline = False
+        self._finished = False
+
+        self._captured = {}
+        self._capture_key = None
+        self._capture_start = None
+        self._capture_parts = []
+        self._capture_length = 0
+
+        # Position tracking (absolute offsets of the current buffer)
+        self._offset = 0
+        self._line = 1
+        self._line_start = 0
+        self._mark = 0  # buffer index up to which _line/_line_start are current
+        self._record_line = 1
+
+    # --- Public API ---------------------------------------------------------
+
+    def feed(self, text: str):
+        """Scan the next chunk of text."""
+        if self.done or not text:
+            return
+        buf = self._pending + text if self._pending else text
+        self._pending = ""
+        pos = self._scan(buf, final=False)
+        self._consume(buf, pos)
+
+    def close(self):
+        """Signal end of input and finish validation."""
+        if self.done:
+            return
+        buf, self._pending = self._pending, ""
+        pos = self._scan(buf, final=True)
+        if self.done:
+            return
+        self._consume(buf, pos)
+        if self._in_string:
+            self._fail_string()
+        elif self._state not in (END, SKIP_LINE):
+            self._fail("", 0, _EXPECTING.get(self._state, "Expecting value"))
+        self._flush_record()
+        self.done = True
+
+    @property
+    def captured(self) -> dict:
+        """Raw captured values of the current/last record (None = over capture_limit)."""
+        return self._captured
+
+    # --- Scanning -----------------------------------------------------------
+
+    def _scan(self, buf: str, final: bool) -> int:
+        """Consume as much of buf as possible; return the index reached."""
+        pos = 0
+        n = len(buf)
+        while pos < n and not self.done:
+            if self._in_string:
+                pos, stalled = self._scan_string(buf, pos, final)
+                if stalled:
+                    return pos  # incomplete escape — wait for more input
+                continue
+
+            state = self._state
+            if state == SKIP_LINE:
+                newline = buf.find("\n", pos)
+                if newline < 0:
+                    return n
+                pos = newline + 1
+                self._state = END
+                self._saw_newline = True
+                continue
+
+            ws_end = _WS.match(buf, pos).end()
+            if state == END and ws_end > pos and "\n" in buf[pos:ws_end]:
+                self._saw_newline = True
+                self._flush_record()
+            pos = ws_end
+            if pos >= n:
+                return n
+            c = buf[pos]
+
+            if state in (VALUE, ARRAY_FIRST):
+                if state == ARRAY_FIRST and c == "]":
+                    self._stack.pop()
+                    self._value_done(buf, pos + 1)
+                    pos += 1
+                    continue
+                new_pos = self._scan_value(buf, pos, final)
+                if new_pos is None:
+                    return pos
+                pos = new_pos
+            elif state in (OBJECT_FIRST, KEY):
+                if state == OBJECT_FIRST and c == "}":
+                    self._stack.pop()
+                    self._value_done(buf, pos + 1)
+                    pos += 1
+                elif c == '"':
+                    self._start_string(buf, pos, "key")
+                    pos += 1
+                else:
+                    self._fail(buf, pos, "Expecting property name enclosed in double quotes")
+            elif state == COLON:
+                if c != ":":
+                    self._fail(buf, pos, "Expecting ':' delimiter")
+                else:
+                    self._state = VALUE
+                    pos += 1
+            elif state == AFTER_VALUE:
+                top = self._stack[-1]
+                if c == "," and (top == "[" or len(self._stack) > 1):
+                    # Below the top-level object's members nothing needs events:
+                    # skip a window's worth of complete items in one match
+                    run = (_MEMBER_RUN if top == "{" else _ARRAY_RUN).match(buf, pos, pos + FAST_WINDOW)
+                    if run.end() > pos:
+                        pos = run.end()
+                        continue
+                if c == ",":
+                    self._state = KEY if top == "{" else VALUE
+                    pos += 1
+                elif (c == "}" and top == "{") or (c == "]" and top == "["):
+                    self._stack.pop()
+                    self._value_done(buf, pos + 1)
+                    pos += 1
+                else:
+                    self._fail(buf, pos, "Expecting ',' delimiter")
+            elif state == END:
+                if self.multi and self._saw_newline:
+                    self.jsonl = True
+                    self._state = VALUE
+                else:
+                    self._fail(buf, pos, "Extra data")
+        return pos
+
+    def _scan_value(self, buf: str, pos: int, final: bool):
+        """Start a value at buf[pos]. Returns the new index, or None if incomplete."""
+        if not self._stack:
+            self._start_record(buf, pos)
+        at_member = len(self._stack) == 1 and self._stack[0] == "{"
+        streaming = at_member and self.stream_key is not None and self._key == self.stream_key
+        if at_member and self._key in self.capture_keys:
+            self._capture_key = self._key
+            self._capture_start = pos
+            self._capture_parts = []
+            self._capture_length = 0
+
+        c = buf[pos]
+        if streaming:
+            self.stream_sink.begin(c == '"')
+
+        if c == '"':
+            if not streaming:
+                match = _FAST_STRING.match(buf, pos, pos + FAST_WINDOW)
+                if match:
+                    self._value_done(buf, match.end())
+                    return match.end()
+            self._start_string(buf, pos, "stream" if streaming else "value")
+            return pos + 1
+
+        if c in "{[":
+            if self._stack:
+                match = _FAST_CONTAINER.match(buf, pos, pos + FAST_WINDOW)
+                if match:
+                    self._value_done(buf, match.end())
+                    return match.end()
+            if len(self._stack) >= MAX_DEPTH:
+                self._fail(buf, pos, "Nesting too deep")
+                return pos
+            self._stack.append(c)
+            self._state = OBJECT_FIRST if c == "{" else ARRAY_FIRST
+            return pos + 1
+
+        if c in "tfnNI-":
+            for literal in _LITERALS:
+                if buf.startswith(literal, pos):
+                    self._value_done(buf, pos + len(literal))
+                    return pos + len(literal)
+                rest = buf[pos:pos + len(literal)]
+                if not final and len(rest) < len(literal) and literal.startswith(rest):
+                    return None  # could still become this literal
+
+        match = _NUMBER.match(buf, pos)
+        if match:
+            if not final and match.end() + 2 >= len(buf):
+                return None  # the number may continue in the next chunk ("1" + "e-5")
+            self._value_done(buf, match.end())
+            return match.end()
+
+        self._fail(buf, pos, "Expecting value")
+        return pos
+
+    def _start_string(self, buf: str, pos: int, role: str):
+        self._in_string = True
+        self._string_role = role
+        self._string_start = self._location(buf, pos) + (self._offset + pos,)
+        self._key_parts = []
+        self._key_length = 0
+
+    def _scan_string(self, buf: str, pos: int, final: bool) -> tuple:
+        """Continue inside a string. Returns (new index, stalled on an incomplete escape)."""
+        n = len(buf)
+        limit = min(n, pos + STRING_WINDOW)
+        end = _STRING_RUN.match(buf, pos, limit).end()
+        if end > pos:
+            held = False
+            if self._string_role != "value":
+                if (limit < n or not final) and limit - end < 6:
+                    # Hold back a trailing high surrogate so it can pair with what follows
+                    if _ends_with_high_surrogate(buf, pos, end):
+                        end -= 6
+                        held = True
+                text = buf[pos:end]
+                if text:
+                    self._emit(json.loads(f'"{text}"') if "\\" in text else text)
+            pos = end
+            if held:
+                return pos, limit == n  # next window, or wait for the next chunk
+        if limit < n and pos >= limit - 6:
+            return pos, False  # Window edge (maybe mid-escape): go on from here with a new window
+        if pos >= n:
+            return pos, False
+
+        c = buf[pos]
+        if c == '"':
+            self._end_string(buf, pos + 1)
+            return pos + 1, False
+        if c != "\\":
+            self._fail(buf, pos, "Invalid control character at")
+            return pos, False
+
+        # A backslash the run didn't take is an incomplete or invalid escape
+        if pos + 1 >= n or (buf[pos + 1] == "u" and pos + 6 > n):
+            if not final:
+                return pos, True
+            if pos + 1 >= n:
+                self._fail_string()
+                return n, False
+        if buf[pos + 1] == "u":
+            self._fail(buf, pos + 1, "Invalid \\uXXXX escape")
+        else:
+            self._fail(buf, pos, "Invalid \\escape")
+        return pos, False
+
+    def _fail_string(self):
+        line, column, char = self._string_start
+        self._report(f"Unterminated string starting at: line {line} column {column} (char {char})")
+
+    def _emit(self, text: str):
+        if self._string_role == "stream":
+            self.stream_sink.write(text)
+        elif self._string_role == "key" and self._key_length < MAX_KEY_LENGTH:
+            self._key_parts.append(text)
+            self._key_length += len(text)
+
+    def _end_string(self, buf: str, pos: int):
+        self._in_string = False
+        role = self._string_role
+        if role == "key":
+            if len(self._stack) == 1:
+                self._key = "".join(self._key_parts)
+            self._state = COLON
+            return
+        if role == "stream":
+            self.stream_sink.finish()
+        self._value_done(buf, pos)
+
+    # --- Bookkeeping --------------------------------------------------------
+
+    def _value_done(self, buf: str, pos: int):
+        """A value ended at buf[:pos]."""
+        if self._capture_start is not None and len(self._stack) == 1:
+            self._append_capture(buf[self._capture_start:pos])
+            if self._capture_length <= self.capture_limit:
+                self._captured[self._capture_key] = "".join(self._capture_parts)
+            else:
+                self._captured[self._capture_key] = None  # too large to keep
+            self._capture_start = None
+        if self._stack:
+            self._state = AFTER_VALUE
+            return
+        self._state = END
+        self._saw_newline = False
+        self._finished = True  # reported once its line ends cleanly
+
+    def _flush_record(self):
+        """Report a completed top-level value."""
+        if self._finished:
+            self._finished = False
+            if self.on_record:
+                self.on_record(self._record_line, self._captured, None)
+
+    def _start_record(self, buf: str, pos: int):
+        self.records += 1
+        self._captured = {}
+        self._key = None
+        self._record_line = self._location(buf, pos)[0]
+
+    def _append_capture(self, text: str):
+        if self._capture_length <= self.capture_limit:
+            self._capture_parts.append(text)
+        self._capture_length += len(text)
+
+    def _consume(self, buf: str, pos: int):
+        """Advance position tracking past buf[:pos]; keep the rest as pending."""
+        if self._capture_start is not None:
+            self._append_capture(buf[self._capture_start:pos])
+            self._capture_start = 0
+        self._location(buf, pos)
+        self._offset += pos
+        self._mark = 0
+        self._pending = buf[pos:]
+
+    def _location(self, buf: str, pos: int) -> tuple:
+        """(line, column) of buf[pos], updating the incremental line counter."""
+        if pos > self._mark:
+            newlines = buf.count("\n", self._mark, pos)
+            if newlines:
+                self._line += newlines
+                self._line_start = self._offset + buf.rfind("\n", self._mark, pos) + 1
+            self._mark = pos
+        return self._line, self._offset + pos - self._line_start + 1
+
+    def _fail(self, buf: str, pos: int, message: str):
+        line, column = self._location(buf, pos)
+        self._report(f"{message}: line {line} column {column} (char {self._offset + pos})")
+
+    def _report(self, message: str):
+        self._finished = False  # e.g. "Extra data" after a value fails that value's line
+        if self.jsonl:
+            # One bad record: report it and resynchronise on the next line
+            if self.on_record:
+                self.on_record(self._record_line, self._captured, message)
+            self._stack = []
+            self._in_string = False
+            self._capture_start = None
+            self._state = SKIP_LINE
+            return
+        self.error = message
+        self.done = True
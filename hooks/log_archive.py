@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Tool: Daily Log Archiver
+Purpose: Roll old daily logs into compressed monthly bundles with an index.
+Usage:
+    python3 hooks/log_archive.py archive [--days N]
+    python3 hooks/log_archive.py list [--month YYYY-MM]
+    python3 hooks/log_archive.py restore YYYY-MM-DD [--output FILE]
+    python3 hooks/log_archive.py reindex
+
+Logs older than N days (DSF_LOG_ARCHIVE_DAYS, default 30) move into
+memory/logs/archive/YYYY-MM.md.gz. Each day is its own gzip member, so a
+bundle is still a valid .gz (`gzip -dc` yields the month's logs in order)
+and any single day can be decompressed without touching the rest.
+
+archive/index.json records, per day: where its member sits in the bundle,
+the raw size and CRC-32, the entry count, the byte offsets of its first and
+last entries, and the last entry's text — enough for session_status and
+recall to answer without decompressing anything. `restore` returns a day's
+log byte-for-byte.
+
+Archiving is crash-safe: members are appended and fsynced before the index
+is atomically replaced, bundles are truncated back to their indexed length
+before appending, and raw logs are only removed once the index lists them.
+
+The index is never trusted blindly, though: raw logs are gone once
+archived, so a bundle is only ever truncated to a length the index
+recorded. If index.json is missing, unreadable or doesn't list a bundle
+that exists, the bundle's members are walked to rebuild its entries (each
+member carries its day as the gzip file name). A bundle that can't be
+walked cleanly is left alone and its month isn't archived into until
+`reindex` succeeds.
+"""
+
+import argparse
+import gzip
+import json
+import io
+import os
+import re
+import sys
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from log_writer import ENTRY_PREFIX, locked, sidecar_path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+LOGS_DIR = PROJECT_ROOT / "memory" / "logs"
+
+ARCHIVE_DIRNAME = "archive"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+
+DEFAULT_ARCHIVE_DAYS = 30
+
+# Members written before they carried a file name are dated by their header
+_HEADER_DAY = re.compile(rb"# Daily Log: (\d{4}-\d{2}-\d{2})")
+
+
+def archive_days_setting() -> int:
+    """Age in days past which logs are archived (0 disables automatic archival)."""
+    try:
+        return max(0, int(os.environ.get("DSF_LOG_ARCHIVE_DAYS", DEFAULT_ARCHIVE_DAYS)))
+    except ValueError:
+        return DEFAULT_ARCHIVE_DAYS
+
+
+def archive_dir(logs_dir: Path) -> Path:
+    return logs_dir / ARCHIVE_DIRNAME
+
+
+def index_path(logs_dir: Path) -> Path:
+    return archive_dir(logs_dir) / INDEX_NAME
+
+
+def bundle_name(day: str) -> str:
+    """Monthly bundle holding a YYYY-MM-DD day."""
+    return f"{day[:7]}.md.gz"
+
+
+def log_day(name: str):
+    """The YYYY-MM-DD date of a daily log file name, or None if it isn't one."""
+    if not name.endswith(".md"):
+        return None
+    try:
+        return datetime.strptime(name[:-3], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def empty_index() -> dict:
+    return {"version": INDEX_VERSION, "bundles": {}, "days": {}}
+
+
+def load_index(logs_dir: Path):
+    """The archive index as stored, or None if it's missing, unreadable or another version."""
+    try:
+        index = json.loads(index_path(logs_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(index, dict) or index.get("version") != INDEX_VERSION
+            or not isinstance(index.get("bundles"), dict) or not isinstance(index.get("days"), dict)):
+        return None
+    return index
+
+
+def read_index(logs_dir: Path) -> dict:
+    """Load the archive index ({"bundles": {...}, "days": {...}}); empty if there is none."""
+    return load_index(logs_dir) or empty_index()
+
+
+def write_index(logs_dir: Path, index: dict):
+    """Durably replace the archive index."""
+    path = index_path(logs_dir)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def describe_log(data: bytes) -> dict:
+    """Entry count, first/last entry offsets and last entry text of a raw log."""
+    prefix = ENTRY_PREFIX.encode("utf-8")
+    count = 0
+    first = last = None
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        stripped = line.lstrip()
+        if stripped.startswith(prefix):
+            count += 1
+            position = offset + len(line) - len(stripped)
+            if first is None:
+                first = position
+            last = position
+        offset += len(line)
+    last_entry = None
+    if last is not None:
+        end = data.find(b"\n", last)
+        last_entry = data[last:end if end >= 0 else len(data)].strip().decode("utf-8", errors="replace")
+    return {
+        "entry_count": count,
+        "first_entry_offset": first,
+        "last_entry_offset": last,
+        "last_entry": last_entry,
+    }
+
+
+def compress_member(day: str, data: bytes) -> bytes:
+    """One gzip member holding a day's log, named YYYY-MM-DD.md so it can be re-indexed."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename=f"{day}.md", mode="wb", fileobj=buffer, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+def member_day(member: bytes, data: bytes):
+    """The YYYY-MM-DD a member holds: its gzip file name, else the log's header line."""
+    flags = member[3]
+    position = 10
+    if flags & 0x04:  # FEXTRA
+        position += 2 + int.from_bytes(member[10:12], "little")
+    if flags & 0x08:  # FNAME
+        end = member.find(b"\0", position)
+        name = member[position:end].decode("latin-1") if end >= 0 else ""
+        if log_day(name) is not None:
+            return name[:-3]
+    match = _HEADER_DAY.match(data)
+    return match.group(1).decode("ascii") if match else None
+
+
+def scan_bundle(bundle: Path) -> tuple:
+    """Walk a bundle's gzip members. Returns (day records, length, clean).
+
+    `clean` is False if a member couldn't be decoded or dated, or the
+    bundle ends in a partial member; `length` then covers only the members
+    before it, and the bundle must not be appended to.
+    """
+    blob = bundle.read_bytes()
+    view = memoryview(blob)
+    days = {}
+    position = 0
+    while position < len(blob):
+        decoder = zlib.decompressobj(wbits=31)
+        try:
+            data = decoder.decompress(view[position:]) + decoder.flush()
+        except zlib.error:
+            return days, position, False
+        if not decoder.eof:
+            return days, position, False
+        length = len(blob) - position - len(decoder.unused_data)
+        day = member_day(blob[position:position + length], data)
+        if day is None or day in days:
+            return days, position, False
+        days[day] = {
+            "bundle": bundle.name,
+            "offset": position,
+            "length": length,
+            "size": len(data),
+            "crc32": zlib.crc32(data),
+            **describe_log(data),
+        }
+        position += length
+    return days, position, True
+
+
+def recover_index(logs_dir: Path, index: dict = None) -> tuple:
+    """Add bundles the index doesn't list by walking their members.
+
+    Returns (index, bundles that must not be appended to).
+    """
+    index = index or empty_index()
+    unsafe = set()
+    for bundle in sorted(archive_dir(logs_dir).glob("????-??.md.gz")):
+        if bundle.name in index["bundles"]:
+            continue
+        days, length, clean = scan_bundle(bundle)
+        for day, record in days.items():
+            index["days"].setdefault(day, record)
+        if clean:
+            index["bundles"][bundle.name] = length
+        else:
+            unsafe.add(bundle.name)
+    return index, unsafe
+
+
+def append_member(bundle: Path, committed: int, member: bytes) -> tuple:
+    """Append a gzip member after the bundle's committed length.
+
+    Anything past `committed` is a member from an interrupted run that the
+    index never recorded, so it's cut off first. `committed` must come from
+    the index (or a clean scan) — never guess it. Returns (offset, length).
+    """
+    fd = os.open(bundle, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        if os.fstat(fd).st_size != committed:
+            os.ftruncate(fd, committed)
+        os.lseek(fd, committed, os.SEEK_SET)
+        view = memoryview(member)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return committed, len(member)
+
+
+def remove_log(log_path: Path):
+    log_path.unlink(missing_ok=True)
+    sidecar_path(log_path).unlink(missing_ok=True)
+
+
+def archive_logs(logs_dir: Path = LOGS_DIR, days: int = None, today=None, wait: bool = True) -> list:
+    """Archive daily logs older than `days` days. Returns the archived dates.
+
+    With wait=False, returns [] at once if another process is archiving.
+    """
+    days = archive_days_setting() if days is None else days
+    if days < 1 or not logs_dir.is_dir():
+        return []
+    cutoff = (today or datetime.now().date()) - timedelta(days=days)
+
+    candidates = []
+    with os.scandir(logs_dir) as entries:
+        for entry in entries:
+            day = log_day(entry.name)
+            if day is not None and day < cutoff and entry.is_file():
+                candidates.append(entry.name[:-3])
+    if not candidates:
+        return []
+
+    folder = archive_dir(logs_dir)
+    folder.mkdir(exist_ok=True)
+    lock_fd = os.open(folder / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            with locked(lock_fd, blocking=wait):
+                return _archive_locked(logs_dir, sorted(candidates))
+        except BlockingIOError:
+            return []
+    finally:
+        os.close(lock_fd)
+
+
+def _archive_locked(logs_dir: Path, candidates: list) -> list:
+    stored = load_index(logs_dir)
+    known = set(stored["bundles"]) if stored else None
+    index, unsafe = recover_index(logs_dir, stored)
+    recovered = known is None or set(index["bundles"]) != known
+    folder = archive_dir(logs_dir)
+    archived, already = [], []
+    for day in candidates:
+        log_path = logs_dir / f"{day}.md"
+        try:
+            data = log_path.read_bytes()
+        except FileNotFoundError:
+            continue  # Another run got there first
+        record = index["days"].get(day)
+        if record and record["size"] == len(data) and record["crc32"] == zlib.crc32(data):
+            already.append(day)  # Indexed by a run that stopped before removing the log
+            continue
+
+        name = bundle_name(day)
+        if name in unsafe:
+            continue  # Bundle we can't account for: keep the raw log
+        offset, length = append_member(folder / name, index["bundles"].get(name, 0),
+                                       compress_member(day, data))
+        index["bundles"][name] = offset + length
+        index["days"][day] = {
+            "bundle": name,
+            "offset": offset,
+            "length": length,
+            "size": len(data),
+            "crc32": zlib.crc32(data),
+            **describe_log(data),
+        }
+        archived.append(day)
+
+    if archived or recovered:
+        write_index(logs_dir, index)
+    for day in archived + already:
+        remove_log(logs_dir / f"{day}.md")
+    return archived
+
+
+def reindex(logs_dir: Path = LOGS_DIR) -> set:
+    """Rebuild index.json from the bundles alone. Returns bundles that didn't scan cleanly."""
+    folder = archive_dir(logs_dir)
+    if not folder.is_dir():
+        return set()
+    lock_fd = os.open(folder / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with locked(lock_fd, blocking=True):
+            index, unsafe = recover_index(logs_dir)
+            write_index(logs_dir, index)
+    finally:
+        os.close(lock_fd)
+    return unsafe
+
+
+def restore_day(day: str, logs_dir: Path = LOGS_DIR, index: dict = None) -> bytes:
+    """Return an archived day's log exactly as it was. Raises KeyError if it isn't archived."""
+    index = index or read_index(logs_dir)
+    record = index["days"][day]
+    with open(archive_dir(logs_dir) / record["bundle"], "rb") as f:
+        f.seek(record["offset"])
+        member = f.read(record["length"])
+    data = gzip.decompress(member)
+    if len(data) != record["size"] or zlib.crc32(data) != record["crc32"]:
+        raise ValueError(f"Archived log for {day} does not match its index entry")
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and restore daily memory logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive", help="Archive logs older than N days")
+    archive.add_argument("--days", type=int, default=None,
+                         help=f"Age threshold in days (default: DSF_LOG_ARCHIVE_DAYS or {DEFAULT_ARCHIVE_DAYS})")
+
+    listing = commands.add_parser("list", help="Print the index of archived days")
+    listing.add_argument("--month", help="Only days in this YYYY-MM")
+
+    restore = commands.add_parser("restore", help="Write an archived day's log to stdout or a file")
+    restore.add_argument("day", help="YYYY-MM-DD")
+    restore.add_argument("--output", type=Path, help="Write here instead of stdout")
+
+    commands.add_parser("reindex", help="Rebuild the index by walking every bundle")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        unsafe = reindex()
+        for name in sorted(unsafe):
+            print(f"{name}: could not walk every member; not appending to it", file=sys.stderr)
+        print(json.dumps({"days": len(read_index(LOGS_DIR)["days"]), "unsafe": sorted(unsafe)}, indent=2))
+    elif args.command == "archive":
+        archived = archive_logs(days=args.days)
+        print(json.dumps({"archived": archived}, indent=2))
+    elif args.command == "list":
+        days = read_index(LOGS_DIR)["days"]
+        if args.month:
+            days = {day: record for day, record in days.items() if day.startswith(args.month)}
+        print(json.dumps(days, indent=2, sort_keys=True))
+    else:
+        try:
+            data = restore_day(args.day)
+        except KeyError:
+            print(f"No archived log for {args.day}", file=sys.stderr)
+            sys.exit(1)
+        if args.output:
+            args.output.write_bytes(data)
+        else:
+            sys.stdout.buffer.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Module: Daily Log Writer
+Purpose: Append to memory logs safely when many sessions write at once.
+Used by: hooks/memory_capture.py
+
+- Header creation is atomic: the header is written to a temp file that is
+  hard-linked into place, so a log never exists without its header and two
+  racing sessions can't both write one.
+- Appends go out as one O_APPEND write under an advisory lock (fcntl.flock
+  where available), so lines from concurrent sessions never interleave.
+- Batch mode buffers entries and writes them with a single syscall on flush.
+- fsync policy (DSF_LOG_FSYNC): "never" (default), "flush" (after every
+  write to the file) or "close" (once when the writer closes).
+- With track_entries, a sidecar (.counts/<log>) holds the number of
+  "- [" entries and the log size it was counted at, kept current under the
+  same lock, so readers get the count without scanning the log. It is one
+  fixed-size record: the writer keeps it open and updates it with a pread
+  and a pwrite per append.
+"""
+
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows — rely on O_APPEND single writes
+    fcntl = None
+
+FSYNC_POLICIES = ("never", "flush", "close")
+
+# Batch mode flushes once this many bytes are buffered
+DEFAULT_MAX_BUFFER = 64 * 1024
+
+# Log lines that count as entries start with this (after stripping)
+ENTRY_PREFIX = "- ["
+
+_OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+_SIDECAR_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+# Sidecar record: entry count, the log size it was counted at, and a check
+# word, so a torn or old-format sidecar reads as missing (and is recounted)
+_SIDECAR = struct.Struct("<QQQ")
+_SIDECAR_CHECK = 0x44534643_4F554E54  # "DSFCOUNT"
+
+
+@contextmanager
+def locked(fd: int, blocking: bool = True):
+    """Hold an exclusive advisory lock on an open file.
+
+    With blocking=False, raises BlockingIOError if another process holds it.
+    """
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def sidecar_path(path: Path) -> Path:
+    """Path of the entry-count sidecar for a log.
+
+    Sidecars live in a subdirectory so rewriting them doesn't touch the logs
+    directory's mtime (session_status keys its cache on it).
+    """
+    return path.parent / ".counts" / path.name
+
+
+def count_entries(text: str) -> int:
+    """Count entry lines in a piece of log text."""
+    return sum(1 for line in text.splitlines() if line.strip().startswith(ENTRY_PREFIX))
+
+
+def open_sidecar(path: Path) -> int:
+    """Open (creating if needed) a log's sidecar for reading and writing."""
+    sidecar = sidecar_path(path)
+    try:
+        return os.open(sidecar, _SIDECAR_FLAGS, 0o644)
+    except FileNotFoundError:
+        sidecar.parent.mkdir(exist_ok=True)
+        return os.open(sidecar, _SIDECAR_FLAGS, 0o644)
+
+
+def _pread(fd: int, size: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, 0)
+    os.lseek(fd, 0, os.SEEK_SET)  # Windows
+    return os.read(fd, size)
+
+
+def _pwrite(fd: int, data: bytes):
+    if hasattr(os, "pwrite"):
+        os.pwrite(fd, data, 0)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)  # Windows
+        os.write(fd, data)
+
+
+def read_sidecar(path: Path, fd: int = None):
+    """Return (entry_count, counted_size) from a log's sidecar, or None."""
+    try:
+        if fd is not None:
+            data = _pread(fd, _SIDECAR.size)
+        else:
+            with open(sidecar_path(path), "rb") as f:
+                data = f.read(_SIDECAR.size)
+    except OSError:
+        return None
+    if len(data) < _SIDECAR.size:
+        return None
+    count, size, check = _SIDECAR.unpack(data)
+    return (count, size) if check == count ^ size ^ _SIDECAR_CHECK else None
+
+
+def write_sidecar(path: Path, count: int, size: int, fd: int = None):
+    """Store a log's count in its sidecar with one write (caller holds the log's lock)."""
+    record = _SIDECAR.pack(count, size, count ^ size ^ _SIDECAR_CHECK)
+    if fd is not None:
+        _pwrite(fd, record)
+        return
+    fd = open_sidecar(path)
+    try:
+        _pwrite(fd, record)
+    finally:
+        os.close(fd)
+
+
+def recount(path: Path) -> tuple:
+    """Stream the whole log and return (entry_count, size)."""
+    prefix = ENTRY_PREFIX.encode("utf-8")
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip().startswith(prefix):
+                count += 1
+        return count, f.tell()
+
+
+def entry_count(path: Path) -> int:
+    """Number of entries in a log — from the sidecar when it matches the log's size."""
+    cached = read_sidecar(path)
+    if cached and cached[1] == path.stat().st_size:
+        return cached[0]
+
+    # Missing or stale sidecar (older log, hand edit): recount once and store it
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        with locked(fd):
+            count, size = recount(path)
+            write_sidecar(path, count, size)
+    finally:
+        os.close(fd)
+    return count
+
+
+def create_with_header(path: Path, header: str) -> bool:
+    """Atomically create `path` containing `header`. Returns False if it already exists."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(header.encode("utf-8"))
+    try:
+        os.link(tmp, path)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        # Filesystem without hard links — fall back to exclusive create
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0))
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.encode("utf-8"))
+        return True
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class LogWriter:
+    """Appends lines to one log file. Use as a context manager."""
+
+    def __init__(self, path, header: str = "", batch: bool = False, fsync: str = None,
+                 max_buffer: int = DEFAULT_MAX_BUFFER, track_entries: bool = False):
+        self.path = Path(path)
+        self.header = header
+        self.batch = batch
+        self.track_entries = track_entries
+        self.fsync = fsync or os.environ.get("DSF_LOG_FSYNC", "never")
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {self.fsync!r}")
+        self.max_buffer = max_buffer
+        self.created = False  # True if this writer created the file
+        self._fd = None
+        self._sidecar_fd = None
+        self._buffer = []
+        self._buffered = 0
+
+    def ensure(self) -> Path:
+        """Open the log, creating it with its header if needed."""
+        if self._fd is None:
+            try:
+                self._fd = os.open(self.path, _OPEN_FLAGS)
+            except FileNotFoundError:
+                self.created = create_with_header(self.path, self.header)
+                self._fd = os.open(self.path, _OPEN_FLAGS)
+        return self.path
+
+    def write(self, line: str):
+        """Append one line (buffered in batch mode)."""
+        if not line.endswith("\n"):
+            line += "\n"
+        if not self.batch:
+            self._append(line)
+            return
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self.max_buffer:
+            self.flush()
+
+    def flush(self):
+        """Write any buffered lines in one append."""
+        if self._buffer:
+            text = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            self._append(text)
+
+    def close(self):
+        """Flush, apply the close fsync policy, and release the file."""
+        try:
+            self.flush()
+            if self._fd is not None and self.fsync == "close":
+                os.fsync(self._fd)
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._sidecar_fd is not None:
+                os.close(self._sidecar_fd)
+                self._sidecar_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _append(self, text: str):
+        data = memoryview(text.encode("utf-8"))
+        added = len(data)
+        self.ensure()
+        with locked(self._fd):
+            size = os.fstat(self._fd).st_size if self.track_entries else 0
+            while data:
+                written = os.write(self._fd, data)
+                size += written
+                data = data[written:]
+            if self.fsync == "flush":
+                os.fsync(self._fd)
+            if self.track_entries:
+                self._update_sidecar(text, added, size)
+
+    def _update_sidecar(self, text: str, added: int, size: int):
+        """Bump the sidecar count (caller holds the lock)."""
+        if self._sidecar_fd is None:
+            self._sidecar_fd = open_sidecar(self.path)
+        cached = read_sidecar(self.path, self._sidecar_fd)
+        if cached and cached[1] == size - added:
+            write_sidecar(self.path, cached[0] + count_entries(text), size, self._sidecar_fd)
+        else:
+            write_sidecar(self.path, *recount(self.path), self._sidecar_fd)
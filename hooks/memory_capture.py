@@ -5,6 +5,9 @@ Purpose: Automatically ensure daily log exists and capture session markers.
 Trigger: Runs async after every Claude response via the Stop hook.
 
 This is the BASIC version (Tier 1+2 memory — no API keys required).
+When the hook input names a transcript, the tool calls, files touched and
+decisions since the last run are logged (see transcript_ingest.py);
+otherwise a plain session marker is.
 """
 
 import json
@@ -12,11 +15,19 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import memory_index
+import hook_probe
+from log_archive import archive_logs
+from log_writer import LogWriter
+from transcript_ingest import ingest, prune_offsets
+
 # Resolve project root (hooks/ is at project root level)
 PROJECT_ROOT = Path(__file__).parent.parent
 MEMORY_DIR = PROJECT_ROOT / "memory"
 LOGS_DIR = MEMORY_DIR / "logs"
 MEMORY_MD = MEMORY_DIR / "MEMORY.md"
+INDEX_DB = PROJECT_ROOT / "data" / "memory_index.db"
+OFFSETS_DIR = PROJECT_ROOT / "data" / "transcript_offsets"
 
 
 def get_today_log_path():
@@ -25,55 +36,114 @@ def get_today_log_path():
     return LOGS_DIR / f"{today}.md"
 
 
+def daily_log_header(day: datetime) -> str:
+    """Header written once at the top of each daily log."""
+    return (
+        f"# Daily Log: {day.strftime('%Y-%m-%d')}\n\n"
+        f"> Session log for {day.strftime('%A, %B %d, %Y')}\n\n"
+        f"---\n\n"
+        f"## Events & Notes\n\n"
+    )
+
+
+def open_today_log(batch: bool = False) -> LogWriter:
+    """Open a writer on today's log (created atomically with its header)."""
+    today = datetime.now()
+    log_path = LOGS_DIR / f"{today.strftime('%Y-%m-%d')}.md"
+    return LogWriter(log_path, header=daily_log_header(today), batch=batch, track_entries=True)
+
+
 def ensure_today_log():
     """Create today's log file if it doesn't exist."""
-    log_path = get_today_log_path()
-    if not log_path.exists():
-        LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        today = datetime.now()
-        log_path.write_text(
-            f"# Daily Log: {today.strftime('%Y-%m-%d')}\n\n"
-            f"> Session log for {today.strftime('%A, %B %d, %Y')}\n\n"
-            f"---\n\n"
-            f"## Events & Notes\n\n"
-        )
-    return log_path
-
-
-def append_to_log(content: str):
-    """Append a timestamped entry to today's log."""
-    log_path = ensure_today_log()
+    with open_today_log() as writer:
+        return writer.ensure()
+
+
+def format_entry(content: str) -> str:
+    """Format a timestamped log line."""
     timestamp = datetime.now().strftime("%H:%M")
-    with open(log_path, "a") as f:
-        f.write(f"- [{timestamp}] {content}\n")
+    return f"- [{timestamp}] {content}\n"
+
+
+def refresh_index(log_path: Path, probe=hook_probe.NULL_PROBE):
+    """Index what was just appended to a log (and MEMORY.md if it changed).
+
+    Best effort: a failure here only leaves drift for `memory_index.py verify`.
+    """
+    try:
+        memory_index.update([log_path], memory_md=MEMORY_MD, logs_dir=LOGS_DIR, db_path=INDEX_DB)
+    except Exception as e:
+        probe.swallowed(e)
+
+
+def append_to_log(content: str, writer: LogWriter = None):
+    """Append a timestamped entry to today's log (or to an open writer).
+
+    An open writer belongs to the caller, who refreshes the index once done with it.
+    """
+    if writer is not None:
+        writer.write(format_entry(content))
+        return
+    with open_today_log() as today_writer:
+        today_writer.write(format_entry(content))
+    refresh_index(today_writer.path)
 
 
 def main():
     """
     Basic memory capture hook.
 
-    In the basic version, this ensures the daily log exists and is ready.
+    In the basic version, this ensures the daily log exists and is ready,
+    and logs what the transcript shows happened since the last run.
     The advanced version (mem0) reads the transcript, extracts facts,
     and stores them as vectors in Pinecone.
     """
+    probe = hook_probe.probe("memory_capture")
     try:
-        # Ensure today's log exists
-        ensure_today_log()
-
-        # Read hook input from stdin (Claude Code passes context)
-        hook_input = sys.stdin.read() if not sys.stdin.isatty() else ""
-
-        if hook_input:
-            try:
-                json.loads(hook_input)  # validate JSON
-                # Log session activity marker
-                append_to_log("Session activity captured")
-            except json.JSONDecodeError:
-                pass
-
-    except Exception:
+        # Batched: this run's entries go out in one append when the writer closes
+        with open_today_log(batch=True) as writer:
+            # Ensure today's log exists
+            with probe.phase("io"):
+                writer.ensure()
+
+            # Read hook input from stdin (Claude Code passes context)
+            with probe.phase("read"):
+                hook_input = sys.stdin.read() if not sys.stdin.isatty() else ""
+            probe.payload_bytes = len(hook_input)
+
+            if hook_input:
+                try:
+                    with probe.phase("parse"):
+                        data = json.loads(hook_input)  # validate JSON
+                except json.JSONDecodeError as e:
+                    probe.swallowed(e)
+                else:
+                    try:
+                        with probe.phase("check"):
+                            entries = ingest(data, OFFSETS_DIR)
+                    except Exception as e:
+                        probe.swallowed(e)  # Unreadable transcript — still log the marker
+                        entries = []
+                    # Fall back to the plain session activity marker
+                    with probe.phase("io"):
+                        for content in entries or ["Session activity captured"]:
+                            append_to_log(content, writer)
+
+        with probe.phase("io"):
+            refresh_index(writer.path, probe)
+
+            # First capture of a new day: roll logs past DSF_LOG_ARCHIVE_DAYS
+            # into the monthly archive (skipped if another session is already on it)
+            if writer.created:
+                probe.detail = "new day: archive pass"
+                archive_logs(LOGS_DIR, wait=False)
+                prune_offsets(OFFSETS_DIR)
+
+    except Exception as e:
         # Hooks should never crash Claude — fail silently
-        pass
+        probe.swallowed(e)
+
+    probe.finish(0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Tool: Memory Consolidation
+Purpose: Find near-duplicate facts across daily logs and MEMORY.md.
+Usage: python3 hooks/memory_dedupe.py [--threshold 0.5] [--stale-threshold 0.8]
+                                      [--min-days 2] [--limit 20]
+                                      [--include-auto] [--rebuild] [--json]
+
+MEMORY.md is meant to stay under ~200 lines, and facts are promoted into it
+from the daily logs. This tool clusters near-duplicate entries in roughly
+linear time instead of comparing every pair:
+
+- each entry becomes a set of 5-byte shingles of its normalized words
+- a 64-value MinHash signature (one-permutation hashing) estimates
+  Jaccard similarity between sets
+- LSH (16 bands of 4) buckets signatures so only likely matches meet;
+  within a bucket, members are checked against its first member and
+  merged with union-find when their similarity reaches --threshold
+
+It reports promotion candidates (facts recurring on --min-days or more
+days that MEMORY.md doesn't have yet, with their variants to merge), facts
+the logs repeat that MEMORY.md already covers, and stale duplicates inside
+MEMORY.md itself. MEMORY.md lines are short and formulaic ("Project: X",
+"Framework: X"), so duplicates there take the stricter --stale-threshold,
+and a cluster whose lines differ in numbers or in their "Key:" prefix is
+marked for review instead of suggesting which line to keep.
+
+Signatures of log entries are cached in data/memory_dedupe.db with a
+per-log processed offset, like memory_index.py, so a re-run only hashes
+lines appended since the last one. Entries the hooks write automatically
+(session markers, tool-call summaries) are ignored unless --include-auto.
+"""
+
+import argparse
+import json
+import operator
+import re
+import sqlite3
+import struct
+import zlib
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from log_archive import read_index, restore_day
+from memory_index import log_source, log_is_current, parse_log, tail_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent
+MEMORY_DIR = PROJECT_ROOT / "memory"
+MEMORY_MD = MEMORY_DIR / "MEMORY.md"
+LOGS_DIR = MEMORY_DIR / "logs"
+CACHE_DB = PROJECT_ROOT / "data" / "memory_dedupe.db"
+
+BUSY_TIMEOUT = 5.0
+
+# MEMORY.md's own guideline ("Keep under ~200 lines")
+LINE_BUDGET = 200
+
+SHINGLE_BYTES = 5
+NUM_BINS = 64
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+DEFAULT_THRESHOLD = 0.5
+STALE_THRESHOLD = 0.8
+
+# Written by memory_capture / transcript_ingest, not worth promoting
+AUTO_ENTRIES = ("Session activity captured", "Tool calls:", "Commands:", "Files touched:")
+
+# Bump when shingling or hashing changes (cached signatures become invalid)
+SIGNATURE_VERSION = 1
+
+_SIGNATURE = struct.Struct(f"<{NUM_BINS}I")
+_WORD = re.compile(r"[^\W_]+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_KEY = re.compile(r"^\**([^:*]{1,40}?)\**\s*:\s")
+_MIX = 0x9E3779B97F4A7C15  # 2^64 / golden ratio
+_MASK64 = (1 << 64) - 1
+_SLOT_SHIFT = 64 - (NUM_BINS.bit_length() - 1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    processed_bytes INTEGER NOT NULL,
+    tail_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    source TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    PRIMARY KEY (source, offset)
+);
+"""
+
+
+# --- MinHash -----------------------------------------------------------------
+
+def shingles(text: str) -> set:
+    """5-byte shingles of the text's lowercased words (the whole text if it's shorter)."""
+    normalized = " ".join(_WORD.findall(text.lower())).encode("utf-8")
+    if len(normalized) <= SHINGLE_BYTES:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_BYTES] for i in range(len(normalized) - SHINGLE_BYTES + 1)}
+
+
+def minhash(shingle_set: set) -> bytes:
+    """Packed MinHash signature of a shingle set.
+
+    One-permutation hashing: each shingle is hashed once (CRC-32, spread
+    over 64 bits by a multiplicative mix), the top bits pick one of
+    NUM_BINS bins and the next 32 are its value; each bin keeps its
+    minimum. Bins no shingle landed in borrow (rotated) from the next
+    filled bin, which keeps short entries comparable.
+    """
+    bins = [None] * NUM_BINS
+    for shingle in shingle_set:
+        h = (zlib.crc32(shingle) * _MIX) & _MASK64
+        slot, value = h >> _SLOT_SHIFT, (h >> 26) & 0xFFFFFFFF
+        if bins[slot] is None or value < bins[slot]:
+            bins[slot] = value
+    filled = [slot for slot in range(NUM_BINS) if bins[slot] is not None]
+    if not filled:
+        return _SIGNATURE.pack(*([0] * NUM_BINS))
+    following = filled[0] + NUM_BINS
+    for slot in range(NUM_BINS - 1, -1, -1):
+        if bins[slot] is not None:
+            following = slot
+        else:
+            borrowed = bins[following % NUM_BINS]
+            bins[slot] = (borrowed ^ ((following - slot) * _MIX)) & 0xFFFFFFFF
+    return _SIGNATURE.pack(*bins)
+
+
+def similarity(left: tuple, right: tuple) -> float:
+    """Estimated Jaccard similarity of two unpacked signatures."""
+    return sum(map(operator.eq, left, right)) / NUM_BINS
+
+
+def is_auto_entry(text: str) -> bool:
+    return text.startswith(AUTO_ENTRIES)
+
+
+# --- Signature cache ---------------------------------------------------------
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, isolation_level=None)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SIGNATURE_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS sources; DROP TABLE IF EXISTS signatures;" + SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+    # A cache: losing the last commit on a crash only means re-signing a few lines
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def sign_rows(rows: list, source: str) -> list:
+    """(source, offset, day, text, signature) for the parsed log rows that have any words."""
+    signed = []
+    for day, _, _, offset, text in rows:
+        shingle_set = shingles(text)
+        if shingle_set:
+            signed.append((source, offset, day, text, minhash(shingle_set)))
+    return signed
+
+
+def store(conn, source: str, signed: list, processed: int, digest: str, replace: bool):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if replace:
+            conn.execute("DELETE FROM signatures WHERE source = ?", (source,))
+        conn.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?)", signed)
+        conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source, processed, digest))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def refresh_cache(conn, logs_dir: Path) -> int:
+    """Sign whatever is new in the logs (live or archived). Returns entries signed this run."""
+    states = {source: (processed, digest) for source, processed, digest
+              in conn.execute("SELECT source, processed_bytes, tail_hash FROM sources")}
+    seen = set()
+    signed_count = 0
+
+    live = sorted(logs_dir.glob("????-??-??.md")) if logs_dir.exists() else []
+    for log_path in live:
+        source = log_source(log_path.stem)
+        seen.add(source)
+        data = log_path.read_bytes()
+        state = states.get(source)
+        if log_is_current(state, data):
+            rows, end = parse_log(data, log_path.stem, state[0])
+            if end == state[0]:
+                continue
+            replace = False
+        else:
+            rows, end = parse_log(data, log_path.stem)
+            replace = True
+        signed = sign_rows(rows, source)
+        store(conn, source, signed, end, tail_hash(data, end), replace)
+        signed_count += len(signed)
+
+    archive = read_index(logs_dir)
+    for day in sorted(archive["days"]):
+        source = log_source(day)
+        if source in seen:
+            continue
+        seen.add(source)
+        state = states.get(source)
+        if state is not None and state[0] >= archive["days"][day]["size"]:
+            continue  # Fully signed while it was live; archived logs don't change
+        data = restore_day(day, logs_dir, archive)
+        if log_is_current(state, data):
+            rows, end = parse_log(data, day, state[0], final=True)  # Line left partial when archived
+            replace = False
+        else:
+            rows, end = parse_log(data, day, final=True)
+            replace = True
+        signed = sign_rows(rows, source)
+        store(conn, source, signed, end, tail_hash(data, end), replace)
+        signed_count += len(signed)
+
+    for source in states.keys() - seen:
+        conn.execute("DELETE FROM signatures WHERE source = ?", (source,))
+        conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+    return signed_count
+
+
+# --- Clustering --------------------------------------------------------------
+
+def memory_items(memory_md: Path) -> list:
+    """MEMORY.md bullets as items (signed fresh each run; the file is small)."""
+    if not memory_md.exists():
+        return []
+    items = []
+    for number, line in enumerate(memory_md.read_text(encoding="utf-8").splitlines(), 1):
+        stripped = line.strip()
+        if stripped.startswith(("- ", "* ")):
+            text = stripped[2:].strip()
+            shingle_set = shingles(text)
+            if shingle_set:
+                items.append({"kind": "memory", "line": number, "text": text,
+                              "signature": minhash(shingle_set)})
+    return items
+
+
+def find(parent: list, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(signatures: list, threshold: float) -> list:
+    """Group signatures at least `threshold` similar. Returns lists of indexes (singletons left out)."""
+    parent = list(range(len(signatures)))
+
+    # Entries repeated word for word are common; only distinct signatures go through LSH
+    distinct = {}
+    for index, signature in enumerate(signatures):
+        first = distinct.setdefault(signature, index)
+        if first != index:
+            parent[index] = first
+
+    width = ROWS * 4  # Bytes per band of the packed signature
+    bands = [defaultdict(list) for _ in range(BANDS)]
+    for signature, index in distinct.items():
+        for band, buckets in enumerate(bands):
+            buckets[signature[band * width:(band + 1) * width]].append(index)
+
+    unpacked = {}
+
+    def values(index):
+        if index not in unpacked:
+            unpacked[index] = _SIGNATURE.unpack(signatures[index])
+        return unpacked[index]
+
+    for buckets in bands:
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Compare against the bucket's first member only, so a bucket of
+            # thousands of near-identical entries costs linear, not quadratic, time
+            head = members[0]
+            for other in members[1:]:
+                root_head, root_other = find(parent, head), find(parent, other)
+                if root_head != root_other and similarity(values(head), values(other)) >= threshold:
+                    parent[root_other] = root_head
+
+    groups = defaultdict(list)
+    for index in range(len(signatures)):
+        groups[find(parent, index)].append(index)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def fact_markers(text: str) -> tuple:
+    """The parts that make two similar lines different facts: numbers and a "Key:" prefix."""
+    key = _KEY.match(text)
+    return (key.group(1).strip().lower() if key else "", tuple(_NUMBER.findall(text)))
+
+
+def stale_duplicates(memory: list, threshold: float) -> list:
+    """Clusters of near-duplicate MEMORY.md lines, each marked "drop" or "review"."""
+    stale = []
+    for group in cluster([item["signature"] for item in memory], threshold):
+        members = sorted((memory[i] for i in group), key=lambda m: m["line"])
+        entry = {"lines": [m["line"] for m in members], "texts": [m["text"] for m in members]}
+        if len({fact_markers(m["text"]) for m in members}) > 1:
+            entry["action"] = "review"  # Same wording, different facts (150/hr vs 175/hr)
+        else:
+            entry["action"] = "drop"
+            entry["keep"] = max(members, key=lambda m: len(m["text"]))["line"]
+        stale.append(entry)
+    return stale
+
+
+def consolidate(memory_md: Path = None, logs_dir: Path = None, db_path: Path = None,
+                threshold: float = DEFAULT_THRESHOLD, min_days: int = 2,
+                include_auto: bool = False, rebuild: bool = False,
+                stale_threshold: float = STALE_THRESHOLD) -> dict:
+    """Refresh the cache, cluster, and build the report."""
+    memory_md = memory_md or MEMORY_MD
+    logs_dir = logs_dir or LOGS_DIR
+    conn = connect(db_path or CACHE_DB)
+    try:
+        if rebuild:
+            conn.executescript("DELETE FROM signatures; DELETE FROM sources;")
+        signed = refresh_cache(conn, logs_dir)
+        items = [{"kind": "log", "day": day, "text": text, "signature": signature}
+                 for day, text, signature in conn.execute("SELECT day, text, signature FROM signatures")
+                 if include_auto or not is_auto_entry(text)]
+    finally:
+        conn.close()
+    log_count = len(items)
+    memory_entries = memory_items(memory_md)
+    items.extend(memory_entries)
+
+    promotions, covered = [], []
+    for group in cluster([item["signature"] for item in items], threshold):
+        members = [items[i] for i in group]
+        logs = [m for m in members if m["kind"] == "log"]
+        memory = sorted((m for m in members if m["kind"] == "memory"), key=lambda m: m["line"])
+        days = sorted({m["day"] for m in logs})
+        if memory and logs:
+            covered.append({"line": memory[0]["line"], "text": memory[0]["text"],
+                            "log_entries": len(logs), "days": len(days), "last_seen": days[-1]})
+        elif len(days) >= min_days:
+            texts = Counter(m["text"] for m in logs)
+            latest = max(logs, key=lambda m: m["day"])["text"]
+            # The most repeated wording, ties going to the most recent
+            suggestion = max(texts, key=lambda text: (texts[text], text == latest))
+            promotions.append({
+                "suggestion": suggestion,
+                "entries": len(logs),
+                "days": len(days),
+                "first_seen": days[0],
+                "last_seen": days[-1],
+                "variants": [text for text, _ in texts.most_common() if text != suggestion][:3],
+            })
+
+    promotions.sort(key=lambda p: (-p["days"], -p["entries"], p["suggestion"]))
+    covered.sort(key=lambda c: -c["log_entries"])
+    memory_lines = len(memory_md.read_text(encoding="utf-8").splitlines()) if memory_md.exists() else 0
+    return {
+        "memory_lines": memory_lines,
+        "line_budget": LINE_BUDGET,
+        "log_entries": log_count,
+        "newly_signed": signed,
+        "promotions": promotions,
+        "already_in_memory": covered,
+        "stale_duplicates": stale_duplicates(memory_entries, stale_threshold),
+    }
+
+
+def print_report(report: dict, limit: int):
+    print(f"MEMORY.md: {report['memory_lines']} lines (budget ~{report['line_budget']}); "
+          f"{report['log_entries']} log entries compared ({report['newly_signed']} new)")
+
+    print("\nStale duplicates in MEMORY.md:" if report["stale_duplicates"] else "\nNo duplicates in MEMORY.md")
+    for dup in report["stale_duplicates"]:
+        lines = ", ".join(str(line) for line in dup["lines"])
+        if dup["action"] == "review":
+            print(f"  lines {lines} — similar wording, different numbers or keys: review by hand")
+        else:
+            print(f"  lines {lines} — keep line {dup['keep']}, drop the rest")
+        for text in dup["texts"]:
+            print(f"      {text}")
+
+    if report["promotions"]:
+        print("\nPromotion candidates (recurring in logs, not in MEMORY.md):")
+    for promotion in report["promotions"][:limit]:
+        print(f"  [{promotion['days']} days, {promotion['entries']} entries, "
+              f"{promotion['first_seen']} → {promotion['last_seen']}] {promotion['suggestion']}")
+        for variant in promotion["variants"]:
+            print(f"      also: {variant}")
+    if len(report["promotions"]) > limit:
+        print(f"  … and {len(report['promotions']) - limit} more")
+
+    if report["already_in_memory"]:
+        print("\nAlready in MEMORY.md, still repeated in logs:")
+    for entry in report["already_in_memory"][:limit]:
+        print(f"  line {entry['line']}: {entry['text']} "
+              f"({entry['log_entries']} log entries on {entry['days']} days, last {entry['last_seen']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate memory entries")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity that counts as a duplicate (default: %(default)s)")
+    parser.add_argument("--stale-threshold", type=float, default=STALE_THRESHOLD,
+                        help="Similarity that makes two MEMORY.md lines duplicates (default: %(default)s)")
+    parser.add_argument("--min-days", type=int, default=2,
+                        help="Days a fact must recur on to be suggested for promotion (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=20, help="Suggestions to print (default: %(default)s)")
+    parser.add_argument("--include-auto", action="store_true",
+                        help="Also cluster the session markers and tool summaries the hooks write")
+    parser.add_argument("--rebuild", action="store_true", help="Discard cached signatures first")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = consolidate(threshold=args.threshold, min_days=args.min_days,
+                         include_auto=args.include_auto, rebuild=args.rebuild,
+                         stale_threshold=args.stale_threshold)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args.limit)
+
+
+if __name__ == "__main__":
+    main()
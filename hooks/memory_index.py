@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Tool: Memory Search Index
+Purpose: Full-text search over daily log entries and MEMORY.md sections.
+Usage:
+    python3 hooks/memory_index.py search TERM... [--limit N] [--raw] [--json]
+    python3 hooks/memory_index.py update
+    python3 hooks/memory_index.py rebuild
+    python3 hooks/memory_index.py verify [--repair]
+
+Entries live in data/memory_index.db: a plain `entries` table with an
+external-content FTS5 table over it, ranked with bm25. Each source (a daily
+log or MEMORY.md) records how many bytes of it are indexed, so
+memory_capture only parses the lines it just appended. A source that
+shrank or whose indexed tail changed is re-indexed from scratch.
+
+Logs rolled into the archive (log_archive.py) keep their entries; `verify`
+checks every source — live, archived and MEMORY.md — against the markdown
+and `--repair` re-indexes whatever drifted.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from log_archive import read_index, restore_day
+from log_writer import ENTRY_PREFIX
+
+PROJECT_ROOT = Path(__file__).parent.parent
+MEMORY_DIR = PROJECT_ROOT / "memory"
+MEMORY_MD = MEMORY_DIR / "MEMORY.md"
+LOGS_DIR = MEMORY_DIR / "logs"
+INDEX_DB = PROJECT_ROOT / "data" / "memory_index.db"
+
+BUSY_TIMEOUT = 5.0
+
+# Bytes before the indexed offset hashed to notice a rewritten log
+TAIL_CHECK_BYTES = 256
+
+MEMORY_SOURCE = "MEMORY.md"
+
+# Stored in PRAGMA user_version once the schema exists
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL,
+    tail_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    day TEXT,
+    time TEXT,
+    section TEXT,
+    offset INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_source ON entries(source, offset);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    content, content='entries', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_ENTRY_TIME = re.compile(r"- \[(\d{1,2}:\d{2})\]\s*")
+
+
+# --- Parsing -----------------------------------------------------------------
+
+def log_source(day: str) -> str:
+    return f"logs/{day}.md"
+
+
+def parse_log(data: bytes, day: str, start: int = 0, final: bool = False) -> tuple:
+    """Entry rows in data[start:] as (day, time, section, offset, content), plus the end offset.
+
+    Only newline-terminated lines are consumed unless `final`, so a line
+    still being written is picked up by the next call.
+    """
+    prefix = ENTRY_PREFIX.encode("utf-8")
+    rows = []
+    offset = start
+    end = len(data) if final else data.rfind(b"\n", start) + 1
+    if end <= start:
+        return rows, start
+    for line in data[start:end].splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(prefix):
+            text = stripped.decode("utf-8", errors="replace")
+            match = _ENTRY_TIME.match(text)
+            time = match.group(1) if match else None
+            content = text[match.end():] if match else text
+            rows.append((day, time, None, offset + len(line) - len(line.lstrip()), content))
+        offset += len(line)
+    return rows, end
+
+
+def parse_memory_md(data: bytes) -> list:
+    """One row per "## " section of MEMORY.md (the part above the first is its title section)."""
+    rows = []
+    section, section_start, lines = None, 0, []
+    offset = 0
+
+    def close():
+        content = "".join(lines).strip()
+        if content:
+            rows.append((None, None, section, section_start, content))
+
+    for line in data.splitlines(keepends=True):
+        text = line.decode("utf-8", errors="replace")
+        if text.startswith("## "):
+            close()
+            section, section_start, lines = text[3:].strip(), offset, []
+        elif section is None and text.startswith("# ") and not lines:
+            section = text[2:].strip()
+        lines.append(text)
+        offset += len(line)
+    close()
+    return rows
+
+
+def tail_hash(data: bytes, end: int) -> str:
+    return hashlib.blake2b(data[max(0, end - TAIL_CHECK_BYTES):end], digest_size=16).hexdigest()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# --- Index -------------------------------------------------------------------
+
+def connect(db_path: Path = INDEX_DB) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, isolation_level=None)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    # The index is derived data (`rebuild` recreates it), so skip the per-commit fsync
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def replace_source(conn, source: str, rows: list, indexed_bytes: int, digest: str):
+    """Swap in a source's full set of rows (caller holds a write transaction)."""
+    conn.execute("DELETE FROM entries WHERE source = ?", (source,))
+    append_rows(conn, source, rows, indexed_bytes, digest)
+
+
+def append_rows(conn, source: str, rows: list, indexed_bytes: int, digest: str):
+    conn.executemany(
+        "INSERT INTO entries (source, day, time, section, offset, content) VALUES (?, ?, ?, ?, ?, ?)",
+        [(source, *row) for row in rows])
+    conn.execute("INSERT OR REPLACE INTO sources (source, indexed_bytes, tail_hash) VALUES (?, ?, ?)",
+                 (source, indexed_bytes, digest))
+
+
+def indexed_state(conn, source: str):
+    """(indexed_bytes, hash) recorded for a source, or None."""
+    return conn.execute("SELECT indexed_bytes, tail_hash FROM sources WHERE source = ?",
+                        (source,)).fetchone()
+
+
+def log_is_current(state, data: bytes, base: int = 0) -> bool:
+    """True if the indexed prefix of a log is still intact (`data` holds the log from `base` on)."""
+    return (state is not None and base <= state[0] <= base + len(data)
+            and tail_hash(data, state[0] - base) == state[1])
+
+
+def read_log_tail(log_path: Path, state) -> tuple:
+    """(bytes, base): the log from TAIL_CHECK_BYTES before its indexed end onwards.
+
+    That is all a current log needs — the bytes its tail hash covers plus
+    what was appended — so a Stop costs the new bytes, not the log's size.
+    """
+    base = max(0, state[0] - TAIL_CHECK_BYTES) if state else 0
+    with open(log_path, "rb") as f:
+        f.seek(base)
+        return f.read(), base
+
+
+def index_log(conn, log_path: Path):
+    """Index whatever was appended to a live log since the last call."""
+    day = log_path.stem
+    source = log_source(day)
+    state = indexed_state(conn, source)
+    data, base = read_log_tail(log_path, state)
+    if log_is_current(state, data, base) and data.rfind(b"\n", state[0] - base) < 0:
+        return  # No new complete lines — don't take the write lock
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        latest = indexed_state(conn, source)  # Another session may have indexed it meanwhile
+        if latest != state:
+            state = latest
+            data, base = read_log_tail(log_path, state)
+        if log_is_current(state, data, base):
+            rows, end = parse_log(data, day, state[0] - base)
+            if end > state[0] - base:
+                rows = [(*row[:3], row[3] + base, row[4]) for row in rows]
+                append_rows(conn, source, rows, base + end, tail_hash(data, end))
+        else:
+            # New, truncated or rewritten: index it from the top
+            data = data if base == 0 else log_path.read_bytes()
+            rows, end = parse_log(data, day)
+            replace_source(conn, source, rows, end, tail_hash(data, end))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def index_memory_md(conn, memory_md: Path):
+    """Re-index MEMORY.md's sections if it changed (it's small; sections are replaced wholesale)."""
+    try:
+        data = memory_md.read_bytes()
+    except FileNotFoundError:
+        data = None
+    state = indexed_state(conn, MEMORY_SOURCE)
+    if data is None and state is None:
+        return
+    if data is not None and state == (len(data), content_hash(data)):
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if data is None:
+            conn.execute("DELETE FROM entries WHERE source = ?", (MEMORY_SOURCE,))
+            conn.execute("DELETE FROM sources WHERE source = ?", (MEMORY_SOURCE,))
+        else:
+            replace_source(conn, MEMORY_SOURCE, parse_memory_md(data), len(data), content_hash(data))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def update(log_paths=None, memory_md: Path = None, logs_dir: Path = None, db_path: Path = None):
+    """Incrementally index the given logs (default: every live log) and MEMORY.md."""
+    logs_dir = logs_dir or LOGS_DIR
+    if log_paths is None:
+        log_paths = sorted(logs_dir.glob("????-??-??.md")) if logs_dir.exists() else []
+    conn = connect(db_path or INDEX_DB)
+    try:
+        index_memory_md(conn, memory_md or MEMORY_MD)
+        for log_path in log_paths:
+            index_log(conn, log_path)
+    finally:
+        conn.close()
+
+
+def expected_sources(memory_md: Path, logs_dir: Path) -> dict:
+    """Every indexable source -> loader returning (rows, indexed_bytes, tail_hash) from the markdown."""
+    sources = {}
+    archive = read_index(logs_dir)
+    for day in archive["days"]:
+        def load(day=day):
+            data = restore_day(day, logs_dir, archive)
+            rows, end = parse_log(data, day, final=True)
+            return rows, end, tail_hash(data, end)
+        sources[log_source(day)] = load
+    if logs_dir.exists():
+        for log_path in logs_dir.glob("????-??-??.md"):
+            def load(log_path=log_path):
+                data = log_path.read_bytes()
+                rows, end = parse_log(data, log_path.stem)
+                return rows, end, tail_hash(data, end)
+            sources[log_source(log_path.stem)] = load  # A live log wins over a stale archived copy
+    if memory_md.exists():
+        def load():
+            data = memory_md.read_bytes()
+            return parse_memory_md(data), len(data), content_hash(data)
+        sources[MEMORY_SOURCE] = load
+    return sources
+
+
+def verify(repair: bool = False, memory_md: Path = None, logs_dir: Path = None,
+           db_path: Path = None) -> dict:
+    """Compare the index with the markdown. Returns {source: problem}; repairs them if asked."""
+    memory_md = memory_md or MEMORY_MD
+    logs_dir = logs_dir or LOGS_DIR
+    conn = connect(db_path or INDEX_DB)
+    drift = {}
+    try:
+        sources = expected_sources(memory_md, logs_dir)
+        indexed = {source for (source,) in conn.execute("SELECT source FROM sources")}
+        indexed |= {source for (source,) in conn.execute("SELECT DISTINCT source FROM entries")}
+
+        for source in sorted(indexed - sources.keys()):
+            drift[source] = "source no longer exists"
+            if repair:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM entries WHERE source = ?", (source,))
+                conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+                conn.execute("COMMIT")
+
+        for source, load in sorted(sources.items()):
+            rows, end, digest = load()
+            stored = conn.execute(
+                "SELECT day, time, section, offset, content FROM entries WHERE source = ? ORDER BY offset",
+                (source,)).fetchall()
+            if source not in indexed:
+                problem = "not indexed"
+            elif stored != rows:
+                problem = f"{len(stored)} indexed entries, {len(rows)} in the markdown"
+                if len(stored) == len(rows):
+                    problem = "indexed entries differ from the markdown"
+            else:
+                continue
+            drift[source] = problem
+            if repair:
+                conn.execute("BEGIN IMMEDIATE")
+                replace_source(conn, source, rows, end, digest)
+                conn.execute("COMMIT")
+
+        try:
+            conn.execute("INSERT INTO entries_fts(entries_fts, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError:
+            drift["(full-text index)"] = "out of sync with the entries table"
+            if repair:
+                conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')")
+    finally:
+        conn.close()
+    return drift
+
+
+def rebuild(memory_md: Path = None, logs_dir: Path = None, db_path: Path = None) -> int:
+    """Drop everything and re-index all sources. Returns the number of entries."""
+    memory_md = memory_md or MEMORY_MD
+    logs_dir = logs_dir or LOGS_DIR
+    conn = connect(db_path or INDEX_DB)
+    try:
+        sources = expected_sources(memory_md, logs_dir)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM sources")
+            conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('delete-all')")
+            for source, load in sources.items():
+                append_rows(conn, source, *load())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('optimize')")
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def fts_query(terms: list) -> str:
+    """Quote each term so user input can't trip FTS5 query syntax (all terms must match)."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms if term.strip())
+
+
+def search(query: str, limit: int = 10, db_path: Path = None) -> list:
+    """Ranked hits for an FTS5 query, best first."""
+    db_path = db_path or INDEX_DB
+    if not db_path.exists():
+        return []
+    conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT)
+    try:
+        cursor = conn.execute(
+            "SELECT e.source, e.day, e.time, e.section, e.offset,"
+            " snippet(entries_fts, 0, '[', ']', '…', 16), entries_fts.rank"
+            " FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+            " WHERE entries_fts MATCH ? ORDER BY entries_fts.rank LIMIT ?",
+            (query, limit))
+        columns = ("source", "date", "time", "section", "offset", "snippet", "score")
+        return [dict(zip(columns, row)) for row in cursor]
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text index over memory logs and MEMORY.md")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    find = commands.add_parser("search", help="Ranked search")
+    find.add_argument("terms", nargs="+")
+    find.add_argument("--limit", type=int, default=10)
+    find.add_argument("--raw", action="store_true", help="Pass the terms through as FTS5 query syntax")
+    find.add_argument("--json", action="store_true", help="Print hits as JSON")
+
+    commands.add_parser("update", help="Index anything new in the live logs and MEMORY.md")
+    commands.add_parser("rebuild", help="Re-index everything from the markdown")
+    check = commands.add_parser("verify", help="Report drift between the index and the markdown")
+    check.add_argument("--repair", action="store_true", help="Re-index drifted sources")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "search":
+        query = " ".join(args.terms) if args.raw else fts_query(args.terms)
+        try:
+            hits = search(query, args.limit)
+        except sqlite3.OperationalError as e:
+            print(f"Search failed: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            print(json.dumps(hits, indent=2, ensure_ascii=False))
+        elif not hits:
+            print("No matches")
+        else:
+            for hit in hits:
+                when = " ".join(part for part in (hit["date"], hit["time"]) if part) or hit["section"]
+                print(f"{when:<17} {hit['source']:<20} {hit['snippet']}")
+    elif args.command == "update":
+        update()
+    elif args.command == "rebuild":
+        print(f"Indexed {rebuild()} entries")
+    else:
+        drift = verify(repair=args.repair)
+        for source, problem in drift.items():
+            print(f"{source}: {problem}")
+        if drift and not args.repair:
+            sys.exit(1)
+        print("Repaired" if drift else "Index matches the markdown")
+
+
+if __name__ == "__main__":
+    main()
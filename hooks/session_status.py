@@ -1,23 +1,65 @@
 """
 Tool: Session Status Gatherer
 Purpose: Collect project state for session-start briefing.
-Usage: python3 hooks/session_status.py
+Usage: python3 hooks/session_status.py [--refresh]
+       python3 hooks/session_status.py --prepare-tasks PATH
 
 Reads local project files and outputs a JSON summary.
 Works from any project directory that follows DSF structure.
+
+Each section comes from a collector in a registry (register_collector).
+Collectors run concurrently, each on its own deadline; a section that
+misses it (a locked tasks.db, a slow network mount) falls back to its
+cached value and is listed under "partial" instead of holding up the
+briefing. Adding a section costs no startup time beyond its own deadline.
+
+Sections with a source signature are cached in .tmp/session_status.json
+alongside it (mtime/size of MEMORY.md, the logs and their archive index,
+tasks.db). Only sections whose sources changed are recomputed; --refresh
+rebuilds everything.
+
+Switching tasks.db to WAL and adding its covering index can take longer
+than the tasks deadline on a large database, and a collector thread is
+abandoned at exit. So it runs in a detached `--prepare-tasks` process
+that outlives the briefing; until it's done the summary just scans.
+It is only started when it can succeed: tasks.db has a tasks table and it
+and its directory are writable. A run that fails anyway leaves a
+tasks.db.prepare.failed marker holding the database's signature, and no
+new run starts until the database changes.
 """
 
+import argparse
+import heapq
 import json
+import os
 import sqlite3
-from datetime import datetime
+import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 
+import hook_probe
+from log_archive import index_path, read_index
+from log_writer import ENTRY_PREFIX, entry_count, locked
+
 PROJECT_ROOT = Path(__file__).parent.parent
 MEMORY_DIR = PROJECT_ROOT / "memory"
 MEMORY_MD = MEMORY_DIR / "MEMORY.md"
 LOGS_DIR = MEMORY_DIR / "logs"
 RULES_DIR = PROJECT_ROOT / ".claude" / "rules"
 TASKS_DB = PROJECT_ROOT / "data" / "tasks.db"
+CACHE_PATH = PROJECT_ROOT / ".tmp" / "session_status.json"
+
+# Covering index for the task summary, and how long to wait on a writer (seconds)
+TASKS_INDEX = "idx_tasks_status_due_date"
+TASKS_BUSY_TIMEOUT = 2.0
+
+# Bump when a section's output format changes
+CACHE_VERSION = 1
+
+# Seconds each collector gets before its section is reported as partial
+COLLECTOR_TIMEOUT = float(os.environ.get("DSF_STATUS_TIMEOUT", 1.0))
 
 
 def get_project_identity():
@@ -49,42 +91,183 @@ def get_project_identity():
     return identity
 
 
+def newest_logs(limit: int = 3) -> list:
+    """Return the `limit` newest daily logs (by YYYY-MM-DD name) without sorting them all."""
+    with os.scandir(LOGS_DIR) as entries:
+        names = heapq.nlargest(limit, (
+            entry.name for entry in entries
+            if entry.name.endswith(".md") and not entry.name.startswith(".") and entry.is_file()
+        ))
+    return [LOGS_DIR / name for name in names]
+
+
+def read_last_entry(log_path: Path, block_size: int = 8192):
+    """Return the last entry line of a log by reading backward from the end."""
+    prefix = ENTRY_PREFIX.encode("utf-8")
+    with open(log_path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        partial = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + partial).split(b"\n")
+            # The first piece may be the tail of a line that starts in an earlier block
+            partial = lines.pop(0) if position > 0 else b""
+            for line in reversed(lines):
+                line = line.strip()
+                if line.startswith(prefix):
+                    return line.decode("utf-8", errors="replace")
+    return None
+
+
 def get_last_session():
     """Find the most recent daily log and extract last entry."""
     if not LOGS_DIR.exists():
         return None
 
-    logs = sorted(LOGS_DIR.glob("*.md"), reverse=True)
-    for log_path in logs[:3]:  # Check last 3 days
-        content = log_path.read_text(encoding="utf-8")
-        lines = [line.strip() for line in content.splitlines() if line.strip().startswith("- [")]
-        if lines:
+    # Archived days are older than any live log, so the index (which answers
+    # without decompressing) is only needed when fewer than 3 logs are live
+    live = {log_path.stem: log_path for log_path in newest_logs(3)}
+    archived = read_index(LOGS_DIR)["days"] if len(live) < 3 else {}
+    for day in heapq.nlargest(3, live.keys() | archived.keys()):  # Check last 3 days
+        if day in live:
+            last_entry = read_last_entry(live[day])
+            count = entry_count(live[day]) if last_entry else 0
+        else:
+            last_entry = archived[day]["last_entry"]
+            count = archived[day]["entry_count"]
+        if last_entry:
             return {
-                "date": log_path.stem,
-                "last_entry": lines[-1],
-                "entry_count": len(lines),
+                "date": day,
+                "last_entry": last_entry,
+                "entry_count": count,
             }
 
     return None
 
 
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def has_status_due_index(conn) -> bool:
+    """True if some index on tasks leads with (status, due_date)."""
+    for row in conn.execute("PRAGMA index_list(tasks)").fetchall():
+        columns = [info[2] for info in conn.execute(f"PRAGMA index_info({quote_identifier(row[1])})")]
+        if columns[:2] == ["status", "due_date"]:
+            return True
+    return False
+
+
+def preparation_marker(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + ".prepare.failed")
+
+
+def db_identity(db_path: Path) -> list:
+    """Inode, mtime and size of the database, plus its WAL's size: a failed preparation holds until they change.
+
+    Only the WAL's size counts: a reader creates (and touches) an empty one.
+    """
+    stat = db_path.stat()
+    wal = file_signature(db_path.with_name(db_path.name + "-wal"))
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size, wal[1] if wal else 0]
+
+
+def record_preparation_failure(db_path: Path):
+    try:
+        preparation_marker(db_path).write_text(json.dumps(db_identity(db_path)))
+    except OSError:
+        pass  # Unwritable directory — can_prepare_tasks rules that out before spawning
+
+
+def preparation_failed(db_path: Path) -> bool:
+    """True if a preparation already failed on the database as it is now."""
+    try:
+        return json.loads(preparation_marker(db_path).read_text()) == db_identity(db_path)
+    except (OSError, ValueError):
+        return False
+
+
+def can_prepare_tasks(conn) -> bool:
+    """Whether a --prepare-tasks run could succeed, so a doomed one isn't spawned on every cache miss."""
+    has_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tasks'").fetchone()
+    return (has_table is not None
+            and os.access(TASKS_DB, os.W_OK) and os.access(TASKS_DB.parent, os.W_OK)
+            and not preparation_failed(TASKS_DB))
+
+
+def prepare_tasks_db(db_path: Path = None):
+    """Idempotently switch tasks.db to WAL and add the (status, due_date) covering index.
+
+    Can take seconds on a large database; one process at a time does it.
+    """
+    db_path = db_path or TASKS_DB
+    lock_fd = os.open(db_path.with_name(db_path.name + ".prepare.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with locked(lock_fd, blocking=False):
+            conn = sqlite3.connect(str(db_path), timeout=TASKS_BUSY_TIMEOUT)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                if not has_status_due_index(conn):
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {TASKS_INDEX} ON tasks(status, due_date)")
+                    conn.commit()
+            finally:
+                conn.close()
+            preparation_marker(db_path).unlink(missing_ok=True)
+    except BlockingIOError:
+        pass  # Another process is already preparing it
+    finally:
+        os.close(lock_fd)
+
+
+def start_tasks_preparation():
+    """Run prepare_tasks_db in a detached process, so exiting doesn't cut it short."""
+    import subprocess  # Only needed once per database
+
+    subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--prepare-tasks", str(TASKS_DB)],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+
+def connect_tasks_readonly():
+    """Read-only connection that waits out (rather than fails on) a busy writer."""
+    return sqlite3.connect(f"{TASKS_DB.as_uri()}?mode=ro", uri=True, timeout=TASKS_BUSY_TIMEOUT)
+
+
 def get_task_summary():
     """Get task counts from SQLite if database exists."""
     if not TASKS_DB.exists():
         return None
 
     try:
-        conn = sqlite3.connect(str(TASKS_DB))
-        pending = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE status='pending'"
-        ).fetchone()[0]
-        overdue = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE status='pending' AND due_date < date('now')"
-        ).fetchone()[0]
-        due_this_week = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE status='pending' AND due_date BETWEEN date('now') AND date('now', '+7 days')"
-        ).fetchone()[0]
-        conn.close()
+        conn = connect_tasks_readonly()
+        try:
+            prepared = (conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+                        and has_status_due_index(conn))
+            preparable = not prepared and can_prepare_tasks(conn)
+        finally:
+            conn.close()
+
+        if preparable:
+            try:
+                start_tasks_preparation()
+            except OSError:
+                pass  # The summary still works, just slower
+
+        conn = connect_tasks_readonly()
+        try:
+            # One statement, three range counts on the (status, due_date) index —
+            # cheaper than evaluating date comparisons row by row in one SUM pass
+            pending, overdue, due_this_week = conn.execute(
+                "SELECT"
+                " (SELECT COUNT(*) FROM tasks WHERE status='pending'),"
+                " (SELECT COUNT(*) FROM tasks WHERE status='pending' AND due_date < date('now')),"
+                " (SELECT COUNT(*) FROM tasks WHERE status='pending'"
+                "  AND due_date BETWEEN date('now') AND date('now', '+7 days'))"
+            ).fetchone()
+        finally:
+            conn.close()
         return {
             "pending": pending,
             "overdue": overdue,
@@ -100,6 +283,10 @@ def get_today_log_exists():
     return (LOGS_DIR / f"{today}.md").exists()
 
 
+def get_memory_exists():
+    return MEMORY_MD.exists()
+
+
 def get_time_of_day():
     """Return morning/afternoon/evening based on current hour."""
     hour = datetime.now().hour
@@ -111,18 +298,175 @@ def get_time_of_day():
         return "evening"
 
 
-def main():
+def file_signature(path: Path):
+    """[mtime_ns, size] of a file, or None if it doesn't exist."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def identity_source(previous):
+    """Identity depends on MEMORY.md and, as a fallback, the billing rule."""
+    return [file_signature(MEMORY_MD), (RULES_DIR / "billing-protocol.md").exists()]
+
+
+def last_session_source(previous):
+    """Last session depends on the set of logs, the newest few of them and the archive index."""
+    directory = file_signature(LOGS_DIR)
+    if directory is None:
+        return None
+    if previous and previous["dir"] == directory:
+        names = [name for name, _ in previous["logs"]]  # Listing unchanged — skip the scan
+    else:
+        names = [log_path.name for log_path in newest_logs(3)]
+    return {
+        "dir": directory,
+        "logs": [[name, file_signature(LOGS_DIR / name)] for name in names],
+        "archive": file_signature(index_path(LOGS_DIR)),
+    }
+
+
+def tasks_source(previous):
+    """Task counts depend on the database (and its WAL) and on today's UTC date."""
+    wal = TASKS_DB.with_name(TASKS_DB.name + "-wal")
+    return [file_signature(TASKS_DB), file_signature(wal), datetime.now(timezone.utc).strftime("%Y-%m-%d")]
+
+
+# Collectors in output order: name -> (compute, source signature or None, deadline seconds)
+COLLECTORS = {}
+
+
+def register_collector(name: str, compute, source=None, timeout: float = None):
+    """Add a section to the briefing.
+
+    `compute()` returns the section's value. `source(previous)` returns a
+    JSON-able signature of what the value depends on (given the previously
+    cached one); with it the value is cached until the signature changes,
+    without it the collector runs every time. Both run on the collector's
+    own thread, so neither can stall the others.
+    """
+    COLLECTORS[name] = (compute, source, COLLECTOR_TIMEOUT if timeout is None else timeout)
+
+
+register_collector("project", get_project_identity, identity_source)
+register_collector("last_session", get_last_session, last_session_source)
+register_collector("tasks", get_task_summary, tasks_source)
+register_collector("today_log_exists", get_today_log_exists)
+register_collector("memory_exists", get_memory_exists)
+
+
+def load_cache() -> dict:
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("sections", {})
+
+
+def save_cache(sections: dict):
+    """Write the cache atomically; a failed write only costs a recompute next time."""
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_PATH.with_name(f"{CACHE_PATH.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "sections": sections}), encoding="utf-8")
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass
+
+
+def run_collector(name: str, entry, result: dict):
+    """Collector thread body: fill result["entry"] (and "changed"), or result["error"]."""
+    compute, source, _ = COLLECTORS[name]
+    try:
+        if source is None:
+            result["entry"] = {"value": compute()}
+            return
+        signature = source(entry["source"] if entry else None)
+        if entry is None or entry["source"] != signature:
+            # Signed before computing, so a write that lands mid-compute
+            # leaves a stale signature and gets picked up next run
+            entry = {"value": compute(), "source": signature}
+            result["changed"] = True
+        result["entry"] = entry
+    except Exception as e:
+        result["error"] = e
+
+
+def gather_sections(refresh: bool = False) -> tuple:
+    """Run every collector concurrently, each against its own deadline.
+
+    Returns (values, partial): partial maps each section that timed out or
+    failed to "stale" (its last cached value was used) or "unavailable".
+    """
+    fallback = load_cache()
+    cached = {} if refresh else fallback
+    started = time.monotonic()
+    runs = {}
+    for name in COLLECTORS:
+        result = {}
+        # Daemon threads: a collector stuck past its deadline can't hold up exit
+        thread = threading.Thread(target=run_collector, args=(name, cached.get(name), result),
+                                  name=f"collector-{name}", daemon=True)
+        thread.start()
+        runs[name] = (thread, result)
+
+    values, partial, fresh = {}, {}, {}
+    changed = False
+    for name, (thread, result) in runs.items():
+        _, source, timeout = COLLECTORS[name]
+        thread.join(max(0.0, started + timeout - time.monotonic()))
+        entry = None if thread.is_alive() else result.get("entry")
+        if entry is None:
+            entry = fallback.get(name)
+            partial[name] = "stale" if entry else "unavailable"
+            values[name] = entry["value"] if entry else None
+        else:
+            values[name] = entry["value"]
+            changed = changed or result.get("changed", False)
+        if source is not None and entry is not None:
+            fresh[name] = entry
+
+    if changed:
+        save_cache(fresh)
+    return values, partial
+
+
+def main(argv=None):
+    probe = hook_probe.probe("session_status")
+    parser = argparse.ArgumentParser(description="Session-start status snapshot")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cache and rebuild every section")
+    parser.add_argument("--prepare-tasks", type=Path, metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.prepare_tasks:
+        try:
+            prepare_tasks_db(args.prepare_tasks)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                record_preparation_failure(args.prepare_tasks)  # Busy is retried on the next miss
+        except (OSError, sqlite3.Error):
+            record_preparation_failure(args.prepare_tasks)  # The summary still works, just slower
+        return
+    probe.detail = "--refresh" if args.refresh else ""
+
     now = datetime.now()
+    with probe.phase("check"):
+        sections, partial = gather_sections(refresh=args.refresh)
     status = {
         "timestamp": now.isoformat(),
         "time_of_day": get_time_of_day(),
-        "project": get_project_identity(),
-        "last_session": get_last_session(),
-        "tasks": get_task_summary(),
-        "today_log_exists": get_today_log_exists(),
-        "memory_exists": MEMORY_MD.exists(),
+        **sections,
     }
-    print(json.dumps(status, indent=2))
+    if partial:
+        status["partial"] = partial
+        probe.detail = "partial: " + ", ".join(sorted(partial))
+    with probe.phase("io"):
+        print(json.dumps(status, indent=2))
+    probe.finish(0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Tool: Hook Telemetry
+Purpose: Opt-in per-invocation timings for the hooks, with a local report.
+Usage:
+    DSF_HOOK_TELEMETRY=1 (in the hooks' environment) to record
+    python3 hooks/telemetry.py report [--since 24h] [--hook NAME] [--slowest 10] [--json]
+    python3 hooks/telemetry.py clear
+
+Each hook invocation records its phase timings (startup, stdin read, parse,
+check, I/O), exit code, payload size, any exception it swallowed, and a
+short detail (the command, for guardrail_check). Startup is the CPU time
+the process spent before the hook began (interpreter start + imports); it
+is 0 for invocations served warm by hook_server.py.
+
+Records are fixed-size structs in a ring buffer (.tmp/telemetry.ring,
+DSF_HOOK_TELEMETRY_CAPACITY records, default 16384) written with pwrite under
+an advisory lock — one open, two small writes and a close per invocation.
+Recording never raises: a failure only loses that record. When telemetry
+is off, hooks get a no-op probe from hook_probe.py and this module is never
+imported, so a cold hook pays nothing for it.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from hook_probe import ENABLED, NULL_PROBE, NullProbe, probe  # noqa: F401 (re-exported)
+from log_writer import locked
+
+PROJECT_ROOT = Path(__file__).parent.parent
+STORE_PATH = Path(os.environ.get("DSF_HOOK_TELEMETRY_PATH", PROJECT_ROOT / ".tmp" / "telemetry.ring"))
+
+CAPACITY = int(os.environ.get("DSF_HOOK_TELEMETRY_CAPACITY", 16384))
+
+# Recording may add at most this much to a warm invocation (checked by the benchmarks)
+OVERHEAD_BUDGET_MS = 0.25
+
+PHASES = ("startup", "read", "parse", "check", "io")
+
+# Header: magic, record size, capacity, sequence number of the next record
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+MAGIC = b"DSFTLM1\0"
+
+# Record: sequence, unix time, hook, exit code, flags, payload bytes,
+# phase and total durations (µs), swallowed error, detail
+RECORD = struct.Struct("<Qd24sbB6xQ6I64s96s")
+FLAG_SERVED = 1
+FLAG_ERROR = 2
+
+_FIELDS = ("seq", "time", "hook", "exit_code", "flags", "payload_bytes",
+           *PHASES, "total", "error", "detail")
+
+
+def _clip(text: str, size: int) -> bytes:
+    """UTF-8 encode `text`, cut to `size` bytes without splitting a character."""
+    return text.encode("utf-8")[:size].decode("utf-8", errors="ignore").encode("utf-8")
+
+
+def _micros(seconds: float) -> int:
+    return min(int(seconds * 1_000_000), 0xFFFFFFFF)
+
+
+class Probe:
+    """Timings for one hook invocation."""
+
+    def __init__(self, hook: str, served: bool = False):
+        self.hook = hook
+        self.served = served
+        self.started = time.perf_counter()
+        # CPU time this process used before the hook started; meaningless when served
+        self.startup = 0.0 if served else time.process_time()
+        self.phases = dict.fromkeys(PHASES[1:], 0.0)
+        self.payload_bytes = 0
+        self.error = ""
+        self.detail = ""
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block (repeated blocks of the same phase add up)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def swallowed(self, exc: BaseException):
+        """Note an exception the hook handled by failing open."""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def finish(self, exit_code: int):
+        """Write the record. Never raises."""
+        total = time.perf_counter() - self.started
+        try:
+            record(self.hook, exit_code, self.served, self.payload_bytes,
+                   [self.startup] + [self.phases[name] for name in PHASES[1:]], total,
+                   self.error, self.detail)
+        except Exception:
+            pass
+
+
+def record(hook: str, exit_code: int, served: bool, payload_bytes: int,
+           phases: list, total: float, error: str = "", detail: str = "", path: Path = None):
+    """Append one record to the ring buffer."""
+    path = path or STORE_PATH
+    flags = (FLAG_SERVED if served else 0) | (FLAG_ERROR if error else 0)
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o600)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o600)
+    try:
+        with locked(fd):
+            magic, size, capacity, seq = HEADER.unpack(os.pread(fd, HEADER.size, 0).ljust(HEADER.size, b"\0"))
+            if magic != MAGIC or size != RECORD.size or capacity < 1:
+                capacity, seq = max(1, CAPACITY), 0  # New (or foreign) file: start over
+            data = RECORD.pack(
+                seq, time.time(), _clip(hook, 24), max(-128, min(127, exit_code)), flags,
+                payload_bytes, *(_micros(value) for value in phases), _micros(total),
+                _clip(error, 64), _clip(detail, 96))
+            os.pwrite(fd, data, HEADER_SIZE + (seq % capacity) * RECORD.size)
+            os.pwrite(fd, HEADER.pack(MAGIC, RECORD.size, capacity, seq + 1), 0)
+    finally:
+        os.close(fd)
+
+
+def read_records(path: Path = None) -> list:
+    """All records still in the ring, oldest first, as dicts (durations in ms)."""
+    path = path or STORE_PATH
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    if len(data) < HEADER.size:
+        return []
+    magic, size, capacity, next_seq = HEADER.unpack_from(data)
+    if magic != MAGIC or size != RECORD.size or capacity < 1:
+        return []
+
+    records = []
+    for seq in range(max(0, next_seq - capacity), next_seq):
+        offset = HEADER_SIZE + (seq % capacity) * RECORD.size
+        if offset + RECORD.size > len(data):
+            continue
+        values = dict(zip(_FIELDS, RECORD.unpack_from(data, offset)))
+        if values["seq"] != seq:
+            continue  # Slot from a torn or out-of-order write
+        for name in ("hook", "error", "detail"):
+            values[name] = values[name].rstrip(b"\0").decode("utf-8", errors="replace")
+        for name in (*PHASES, "total"):
+            values[name] /= 1000.0
+        values["served"] = bool(values["flags"] & FLAG_SERVED)
+        records.append(values)
+    return records
+
+
+def parse_window(text: str) -> timedelta:
+    """Parse a window such as 30m, 24h or 7d."""
+    units = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+    if len(text) < 2 or text[-1] not in units:
+        raise argparse.ArgumentTypeError(f"window must look like 30m, 24h or 7d, got {text!r}")
+    try:
+        return timedelta(**{units[text[-1]]: float(text[:-1])})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"window must look like 30m, 24h or 7d, got {text!r}")
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(records: list, slowest: int = 10) -> dict:
+    """Per-hook latency percentiles, phase medians, error and block rates, plus the slowest calls."""
+    hooks = {}
+    for hook in sorted({r["hook"] for r in records}):
+        rows = [r for r in records if r["hook"] == hook]
+        totals = sorted(r["total"] for r in rows)
+        errors = [r for r in rows if r["error"]]
+        hooks[hook] = {
+            "count": len(rows),
+            "served": sum(r["served"] for r in rows),
+            "p50_ms": round(percentile(totals, 0.50), 3),
+            "p99_ms": round(percentile(totals, 0.99), 3),
+            "max_ms": round(totals[-1], 3),
+            "phase_p50_ms": {name: round(percentile(sorted(r[name] for r in rows), 0.50), 3)
+                             for name in PHASES},
+            "error_rate": round(len(errors) / len(rows), 4),
+            "nonzero_exit_rate": round(sum(1 for r in rows if r["exit_code"]) / len(rows), 4),
+            "errors": sorted({r["error"] for r in errors})[:5],
+        }
+    slow = sorted(records, key=lambda r: r["total"], reverse=True)[:slowest]
+    return {
+        "records": len(records),
+        "hooks": hooks,
+        "slowest": [{
+            "hook": r["hook"],
+            "time": datetime.fromtimestamp(r["time"]).isoformat(timespec="seconds"),
+            "total_ms": round(r["total"], 3),
+            "exit_code": r["exit_code"],
+            "detail": r["detail"],
+        } for r in slow],
+    }
+
+
+def print_report(summary: dict):
+    print(f"{summary['records']} invocations")
+    print(f"{'hook':<18}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>9}  "
+          + " ".join(f"{name:>8}" for name in PHASES))
+    for hook, stats in summary["hooks"].items():
+        phases = " ".join(f"{stats['phase_p50_ms'][name]:>8.3f}" for name in PHASES)
+        print(f"{hook:<18}{stats['count']:>7}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+              f"{stats['max_ms']:>10.3f}{stats['error_rate']:>8.1%}  {phases}")
+        for error in stats["errors"]:
+            print(f"    swallowed: {error}")
+    if summary["slowest"]:
+        print("\nSlowest invocations:")
+        for row in summary["slowest"]:
+            print(f"  {row['total_ms']:>9.3f} ms  {row['hook']:<16} {row['time']}  {row['detail']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hook timing telemetry")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="Summarize recorded invocations")
+    report.add_argument("--since", type=parse_window, help="Only the last window, e.g. 30m, 24h, 7d")
+    report.add_argument("--hook", help="Only this hook")
+    report.add_argument("--slowest", type=int, default=10, help="How many slow invocations to list")
+    report.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    commands.add_parser("clear", help="Delete the recorded telemetry")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        STORE_PATH.unlink(missing_ok=True)
+        return
+
+    records = read_records()
+    if args.since:
+        cutoff = time.time() - args.since.total_seconds()
+        records = [r for r in records if r["time"] >= cutoff]
+    if args.hook:
+        records = [r for r in records if r["hook"] == args.hook]
+    if not records:
+        print("No telemetry recorded" + ("" if ENABLED else " (set DSF_HOOK_TELEMETRY=1 to record)"),
+              file=sys.stderr)
+        return
+
+    summary = summarize(records, args.slowest)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,92 @@ Trigger: Runs after Bash tool use when configured.
 
 Exit code 0 = validation passed (or not applicable)
 Non-zero = validation failed (prints feedback)
+
+JSON Lines output is checked record by record. A record is a JSON value
+starting on a new line; it may span lines (pretty-printed, like jq's
+default output), and a bad record only fails itself — checking resumes on
+the line after the error.
+Hook input over DSF_VALIDATE_STREAM_THRESHOLD chars (default 8 MiB) is
+validated incrementally in bounded memory (see json_stream.py, imported
+only then: its regexes take longer to compile than the rest of this hook
+takes to start); past DSF_VALIDATE_MAX_BYTES of UTF-8 input (default
+256 MiB, 0 = no cap) validation stops and only failures already seen are
+reported.
 """
 
 import json
+import os
+import re
 import sys
+from itertools import chain
+
+import hook_probe
+
+STREAM_THRESHOLD = int(os.environ.get("DSF_VALIDATE_STREAM_THRESHOLD", 8 * 1024 * 1024))
+MAX_VALIDATE_BYTES = int(os.environ.get("DSF_VALIDATE_MAX_BYTES", 256 * 1024 * 1024))
+READ_CHUNK = 1024 * 1024
+
+# JSON Lines failures listed individually before summarizing the rest
+MAX_REPORTED_FAILURES = 5
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def record_failure(data):
+    """Return the failure reason if a parsed record reports success: false."""
+    if isinstance(data, dict) and data.get("success") is False:
+        error = data.get("error", "Unknown error")
+        return f"Script reported failure: {error}"
+    return None
+
+
+def summarize_records(total: int, failed: int, samples: list) -> dict:
+    """Result for JSON Lines output from per-record failures [(line, reason)]."""
+    if not failed:
+        return {"valid": True, "reason": f"Valid JSON Lines output ({total} records)"}
+    listed = "; ".join(f"line {line}: {reason}" for line, reason in samples)
+    if failed > len(samples):
+        listed += f"; and {failed - len(samples)} more"
+    return {
+        "valid": False,
+        "reason": f"JSON Lines output: {failed} of {total} records failed — {listed}"
+    }
+
+
+def follows_line_break(output: str, pos: int) -> bool:
+    """True if only whitespace including a newline separates output[pos] from what precedes it."""
+    start = pos
+    while start > 0 and output[start - 1] in " \t\r\n":
+        start -= 1
+    return "\n" in output[start:pos]
+
+
+def validate_json_lines(output: str) -> dict:
+    """Check newline-separated JSON records one by one (the same rule as JsonStreamScanner)."""
+    total = failed = 0
+    samples = []
+    pos = _WHITESPACE.match(output).end()
+    while pos < len(output):
+        total += 1
+        line = output.count("\n", 0, pos) + 1
+        try:
+            data, end = _DECODER.raw_decode(output, pos)
+            following = _WHITESPACE.match(output, end).end()
+            if following < len(output) and "\n" not in output[end:following]:
+                raise json.JSONDecodeError("Extra data", output, following)
+            reason = record_failure(data)
+            pos = following
+        except json.JSONDecodeError as e:
+            reason = f"not valid JSON: {str(e)}"
+            # Resynchronise on the line after the error
+            newline = output.find("\n", e.pos)
+            pos = len(output) if newline < 0 else _WHITESPACE.match(output, newline + 1).end()
+        if reason:
+            failed += 1
+            if len(samples) < MAX_REPORTED_FAILURES:
+                samples.append((line, reason))
+    return summarize_records(total, failed, samples)
 
 
 def validate_json_output(output: str) -> dict:
@@ -17,50 +99,248 @@ def validate_json_output(output: str) -> dict:
     if not output.strip():
         return {"valid": True, "reason": "Empty output (may be intentional)"}
 
+    try:
+        return _validate_parsed(output)
+    except RecursionError:
+        # Nested deeper than json's recursion limit; the scanner has none of its own
+        return validate_incrementally(output)
+
+
+def _validate_parsed(output: str) -> dict:
     try:
         data = json.loads(output)
     except json.JSONDecodeError as e:
+        if e.msg == "Extra data" and follows_line_break(output, e.pos):
+            return validate_json_lines(output)
         return {
             "valid": False,
             "reason": f"Script output is not valid JSON: {str(e)}"
         }
 
     # Check for error indicators
-    if isinstance(data, dict):
-        if data.get("success") is False:
-            error = data.get("error", "Unknown error")
-            return {
-                "valid": False,
-                "reason": f"Script reported failure: {error}"
-            }
+    failure = record_failure(data)
+    if failure:
+        return {"valid": False, "reason": failure}
 
     return {"valid": True, "reason": "Valid JSON output"}
 
 
-def main():
-    """Read hook input, validate the tool output."""
-    try:
-        hook_input = sys.stdin.read()
-        if not hook_input:
-            sys.exit(0)
+def captured_failure(captured: dict):
+    """record_failure() for the raw top-level values a JsonStreamScanner captured."""
+    data = {}
+    for key, raw in captured.items():
+        data[key] = "(value too large to display)" if raw is None else json.loads(raw)
+    return record_failure(data)
+
+
+class StreamingOutputCheck:
+    """Validates the hook payload's tool_output as the outer scanner streams it."""
+
+    def __init__(self):
+        self.begin(False)
+
+    def begin(self, is_string: bool):
+        # A repeated tool_output key starts over (json.loads keeps the last one)
+        self.applicable = is_string
+        self.scanner = None
+        self.trailing = []  # whitespace json doesn't allow, held until more text follows
+        self.total = self.failed = 0
+        self.samples = []
+
+    def write(self, text: str):
+        if not self.applicable:
+            return
+        if self.scanner is None:
+            text = text.lstrip()
+            if not text:
+                return
+            # Only validate if the output looks like it should be JSON
+            if text[0] not in "{[":
+                self.applicable = False
+                return
+            from json_stream import JsonStreamScanner
+
+            self.scanner = JsonStreamScanner(
+                multi=True, capture_keys=("success", "error"), on_record=self.on_record)
+        # evaluate() strips tool_output with str.strip(), so trailing whitespace
+        # beyond JSON's own (form feeds, U+2028, ...) must not count as extra data
+        body = text.rstrip()
+        if not body and not self.trailing and not text.strip(" \t\n\r"):
+            self.scanner.feed(text)
+            return
+        if not body:
+            self.trailing.append(text)
+            return
+        if self.trailing:
+            self.scanner.feed("".join(self.trailing))
+            self.trailing = []
+        self.scanner.feed(body)
+        if len(body) < len(text):
+            self.trailing.append(text[len(body):])
+
+    def finish(self):
+        if self.scanner is not None:
+            self.scanner.close()
+
+    def on_record(self, line: int, captured: dict, error):
+        self.total += 1
+        reason = f"not valid JSON: {error}" if error else captured_failure(captured)
+        if reason:
+            self.failed += 1
+            if len(self.samples) < MAX_REPORTED_FAILURES:
+                self.samples.append((line, reason))
+
+    def result(self):
+        """Final result dict, or None if tool_output wasn't JSON-looking."""
+        if self.scanner is None:
+            return None
+        if self.scanner.error:
+            return {"valid": False, "reason": f"Script output is not valid JSON: {self.scanner.error}"}
+        if self.scanner.jsonl:
+            return summarize_records(self.total, self.failed, self.samples)
+        if self.samples:
+            return {"valid": False, "reason": self.samples[0][1]}
+        return {"valid": True, "reason": "Valid JSON output"}
 
-        data = json.loads(hook_input)
-        tool_output = data.get("tool_output", "")
+    def partial_result(self):
+        """Result when input was cut off at the size cap: only failures seen so far."""
+        if self.scanner is None:
+            return None
+        if self.scanner.jsonl:
+            result = summarize_records(self.total, self.failed, self.samples)
+        else:
+            failure = self.samples[0][1] if self.samples else captured_failure(self.scanner.captured)
+            result = {"valid": not failure, "reason": failure or ""}
+        if not result["valid"]:
+            result["reason"] += " (validation stopped at the size cap)"
+        return result
+
+
+def slices(text: str):
+    """Yield `text` in READ_CHUNK pieces."""
+    for start in range(0, len(text), READ_CHUNK):
+        yield text[start:start + READ_CHUNK]
+
+
+def utf8_length(text: str) -> int:
+    """Size of `text` in UTF-8 (the cap is in bytes, as the input arrived)."""
+    return len(text) if text.isascii() else len(text.encode("utf-8", errors="surrogatepass"))
+
+
+def validate_incrementally(output: str) -> dict:
+    """validate_json_output() via the streaming scanner, for output json.loads can't take."""
+    check = StreamingOutputCheck()
+    check.begin(True)
+    for piece in slices(output):
+        check.write(piece)
+    check.finish()
+    return check.result() or {"valid": True, "reason": "Valid JSON output"}
+
+
+def evaluate_stream(chunks, probe=hook_probe.NULL_PROBE) -> tuple:
+    """Evaluate hook input arriving in chunks, in bounded memory."""
+    from json_stream import JsonStreamScanner
+
+    check = StreamingOutputCheck()
+    payload = JsonStreamScanner(stream_key="tool_output", stream_sink=check)
+    seen = 0
+    capped = False
+    for chunk in chunks:
+        seen += utf8_length(chunk)
+        probe.payload_bytes = seen
+        if MAX_VALIDATE_BYTES and seen > MAX_VALIDATE_BYTES:
+            capped = True
+            break
+        with probe.phase("check"):  # Parsing and checking happen in the same pass
+            payload.feed(chunk)
+        if payload.error:
+            return 0, ""  # Hook input isn't JSON — nothing to validate
+
+    if capped:
+        probe.detail = "stopped at the size cap"
+        result = check.partial_result()
+    else:
+        with probe.phase("check"):
+            payload.close()
+        if payload.error:
+            return 0, ""
+        result = check.result()
+
+    if result and not result["valid"]:
+        # Don't block (exit 0) — just inform
+        return 0, f"Output validation warning: {result['reason']}"
+    return 0, ""
+
+
+def read_chunks(stream, probe=hook_probe.NULL_PROBE):
+    """Yield a text stream in READ_CHUNK pieces."""
+    while True:
+        with probe.phase("read"):
+            chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate(hook_input: str, probe=hook_probe.NULL_PROBE) -> tuple:
+    """Evaluate raw hook input. Returns (exit_code, output) for the hook."""
+    probe.payload_bytes = len(hook_input)
+    if not hook_input:
+        return 0, ""
+
+    if len(hook_input) > STREAM_THRESHOLD:
+        try:
+            return evaluate_stream(slices(hook_input), probe)
+        except Exception as e:
+            probe.swallowed(e)
+            return 0, ""  # Never block on validation errors
+
+    try:
+        with probe.phase("parse"):
+            data = json.loads(hook_input)
+            tool_output = data.get("tool_output", "")
 
         # Only validate if the output looks like it should be JSON
         # (starts with { or [)
         stripped = tool_output.strip()
         if stripped and (stripped.startswith("{") or stripped.startswith("[")):
-            result = validate_json_output(stripped)
+            with probe.phase("check"):
+                result = validate_json_output(stripped)
             if not result["valid"]:
-                print(f"Output validation warning: {result['reason']}")
                 # Don't block (exit 0) — just inform
-                sys.exit(0)
+                return 0, f"Output validation warning: {result['reason']}"
+
+    except Exception as e:
+        probe.swallowed(e)  # Never block on validation errors
+
+    return 0, ""
+
+
+def evaluate_file(stream, probe=hook_probe.NULL_PROBE) -> tuple:
+    """Evaluate hook input read from a text stream: parsed whole if small, streamed past STREAM_THRESHOLD."""
+    with probe.phase("read"):
+        head = stream.read(STREAM_THRESHOLD + 1)
+    if len(head) <= STREAM_THRESHOLD:
+        return evaluate(head, probe)
+    # In READ_CHUNK pieces: the scanner's working set scales with the chunk it's fed
+    return evaluate_stream(chain(slices(head), read_chunks(stream, probe)), probe)
+
+
+def main():
+    """Read hook input, validate the tool output."""
+    probe = hook_probe.probe("validate_output")
+    try:
+        exit_code, output = evaluate_file(sys.stdin, probe)
+        if output:
+            with probe.phase("io"):
+                print(output)
 
-        sys.exit(0)
+    except Exception as e:
+        probe.swallowed(e)
+        exit_code = 0  # Never block on validation errors
 
-    except Exception:
-        sys.exit(0)  # Never block on validation errors
+    probe.finish(exit_code)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+"""
+Differential tests: hooks/guardrail_engine.py against the plain sequential
+rule loop it replaced.
+
+Commands are generated from fragments of dangerous and harmless shell, in
+random case, spacing and separators. RuleEngine.check must give the same
+verdict and reason as walking the rules one by one — for the shipped rule
+set, and for rule sets with inline flags and groups/backreferences, which
+must keep their meaning outside the combined alternation.
+
+The deletion test is the one intended change: a protected file is also
+guarded when any segment runs rm/unlink (tab-separated, piped to xargs,
+behind sudo), not only when the command contains "rm " or "delete".
+
+Run: python3 -m pytest tests  (or python3 -m unittest discover tests)
+"""
+
+import random
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks"))
+
+import guardrail_engine  # noqa: E402
+from guardrail_check import BLOCKED_PATTERNS, PROTECTED_FILES  # noqa: E402
+from guardrail_engine import RuleEngine  # noqa: E402
+
+FRAGMENTS = [
+    "rm -rf /", "rm -fr ~", "rm -rf .", "rm  -Rf /tmp", "rm -r -f /", "rm\t.env", "unlink", "rm", "delete",
+    "git push --force", "git push -f", "git push", "git push --force-with-lease", "git reset --hard",
+    "git reset --soft", "git commit --no-verify", "DROP TABLE users", "drop database x", "DELETE FROM t",
+    "deleted", "sudo", "xargs", "env X=1", "command", "cat", "grep", "echo", "ls -la", "python3 skill.py",
+    "'rm -rf /'", '"drop table"', "\\rm", "x x", "push push", "rm rm -rf", "(rm", "{ unlink",
+] + PROTECTED_FILES + [name.upper() for name in PROTECTED_FILES] + ["notes.env.bak", "CLAUDE.mdx"]
+
+SEPARATORS = [" ", "  ", "\t", " | ", " && ", "; ", " || ", "\n", " & ", "|"]
+
+# Rules that must be scanned on their own: inline flags and groups/backreferences
+FLAGGED_PATTERNS = [
+    (re.compile(r"(?x) git \s+ push \s+ origin"), "push origin (verbose)"),
+    (re.compile(r"(?s)cat.*grep"), "cat…grep across lines"),
+    (re.compile(r"(?i)SUDO\s+RM"), "sudo rm"),
+    (re.compile(r"echo\s+[a-z]+", re.ASCII), "echo word"),
+]
+GROUPED_PATTERNS = [
+    (re.compile(r"\b(\w+)\s+\1\b"), "repeated word"),
+    (re.compile(r"(?P<verb>push|rm)\s+(?P=verb)"), "doubled verb"),
+    (re.compile(r"(drop|delete)\s+(table|from)"), "SQL"),
+]
+
+
+def random_command(rng: random.Random) -> str:
+    parts = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 5))]
+    command = parts[0]
+    for part in parts[1:]:
+        command += rng.choice(SEPARATORS) + part
+    roll = rng.random()
+    if roll < 0.2:
+        command = command.upper()
+    elif roll < 0.3:
+        command = " " + command + rng.choice(["", " ", "\n"])
+    return command
+
+
+def sequential_check(blocked_patterns, protected_files, command: str) -> dict:
+    """Every rule tried in order, one at a time — the loop RuleEngine replaces."""
+    cmd_lower = command.lower().strip()
+    for regex, label in blocked_patterns:
+        if regex.search(cmd_lower):
+            return {
+                "allow": False,
+                "reason": f"BLOCKED: Command contains dangerous pattern '{label}'. "
+                         f"This is blocked by guardrail rules. If you need to do this, "
+                         f"ask the user for explicit confirmation first."
+            }
+    deletes = ("rm " in cmd_lower or "delete" in cmd_lower
+               or any(guardrail_engine.command_word(segment) in guardrail_engine.DELETE_COMMANDS
+                      for segment in guardrail_engine.split_segments(command)))
+    for protected in protected_files:
+        if protected in command and deletes:
+            return {
+                "allow": False,
+                "reason": f"BLOCKED: Cannot delete protected file '{protected}'. "
+                         f"This file is critical to the system."
+            }
+    return {"allow": True, "reason": ""}
+
+
+class EngineMatchesSequentialLoop(unittest.TestCase):
+    CASES = 3000
+
+    def check_rule_set(self, seed: int, blocked_patterns):
+        engine = RuleEngine(blocked_patterns, PROTECTED_FILES)
+        rng = random.Random(seed)
+        for case in range(self.CASES):
+            command = random_command(rng)
+            expected = sequential_check(blocked_patterns, PROTECTED_FILES, command)
+            with self.subTest(case=case, command=command):
+                self.assertEqual(engine.check(command), expected)
+                self.assertEqual(engine.check(command), expected)  # Again, from the cache
+                hits = engine.matching_rules(command)
+                self.assertEqual(not hits, expected["allow"])
+
+    def test_shipped_rules(self):
+        self.check_rule_set(1, BLOCKED_PATTERNS)
+
+    def test_rules_with_inline_flags(self):
+        rules = FLAGGED_PATTERNS[:2] + BLOCKED_PATTERNS + FLAGGED_PATTERNS[2:]
+        self.assertEqual(len(RuleEngine(rules, [])._blocked_rest), len(FLAGGED_PATTERNS))
+        self.check_rule_set(2, rules)
+
+    def test_rules_with_groups_and_backreferences(self):
+        rules = GROUPED_PATTERNS[:1] + BLOCKED_PATTERNS + GROUPED_PATTERNS[1:]
+        self.assertEqual(len(RuleEngine(rules, [])._blocked_rest), len(GROUPED_PATTERNS))
+        self.check_rule_set(3, rules)
+
+    def test_mixed_rules_report_the_first_in_order(self):
+        rules = GROUPED_PATTERNS + FLAGGED_PATTERNS + BLOCKED_PATTERNS
+        self.check_rule_set(4, rules)
+        engine = RuleEngine(rules, PROTECTED_FILES)
+        self.assertIn("'repeated word'", engine.check("git push push --force")["reason"])
+
+    def test_flags_and_groups_keep_their_meaning(self):
+        engine = RuleEngine(FLAGGED_PATTERNS + GROUPED_PATTERNS, [])
+        self.assertFalse(engine.check("git push origin main")["allow"])  # (?x) ignores the pattern's spaces
+        self.assertFalse(engine.check("cat log\ngrep x")["allow"])  # (?s) dot crosses the newline
+        self.assertFalse(engine.check("echo echo")["allow"])  # \1 still refers to its own group
+        self.assertTrue(engine.check("echo 12")["allow"])
+        self.assertTrue(engine.check("push rm")["allow"])
+
+    def test_cached_verdict_is_a_copy(self):
+        engine = RuleEngine(BLOCKED_PATTERNS, PROTECTED_FILES)
+        engine.check("ls")["allow"] = False
+        self.assertTrue(engine.check("ls")["allow"])
+
+
+class DeletionVerdicts(unittest.TestCase):
+    engine = RuleEngine(BLOCKED_PATTERNS, PROTECTED_FILES)
+
+    def test_newly_blocked(self):
+        # The substring loop allowed these: no "rm " and no "delete" in the text
+        for command in ("unlink .env", "rm\t.env", "cat .env | xargs rm", "sudo unlink credentials.json"):
+            with self.subTest(command=command):
+                self.assertFalse(self.engine.check(command)["allow"])
+                self.assertIn("Cannot delete protected file", self.engine.check(command)["reason"])
+
+    def test_still_allowed(self):
+        for command in ("cat .env | grep unlink", "echo rm > notes.txt", "grep -r unlink .", "ls .env"):
+            with self.subTest(command=command):
+                self.assertEqual(self.engine.check(command), {"allow": True, "reason": ""})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Differential tests: hooks/json_stream.py and the streaming path of
+hooks/validate_output.py against json.loads and the plain path.
+
+Documents are random JSON values, some mutated into invalid ones, fed in
+random chunk splits — including with tiny scanner windows, so window and
+chunk edges land inside escapes, surrogate pairs and numbers. Verdicts must
+match; error positions may differ (the scanner reports where it noticed).
+
+Run: python3 -m pytest tests  (or python3 -m unittest discover tests)
+"""
+
+import json
+import random
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks"))
+
+import json_stream  # noqa: E402
+import validate_output  # noqa: E402
+from json_stream import JsonStreamScanner  # noqa: E402
+
+SCALARS = [0, -1, 1.5, 1e-5, -2.5e30, True, False, None, "", "a", 'q"uote', "back\\slash",
+           "tab\tnew\nline", "é", "😀", " ", 123456789, "/", "\x7f"]
+KEYS = ["a", "b", "success", "error", "tool_output", "k\\", "😀", ""]
+NOISE = list('{}[],:"\\ \n\t\r0123456789-+.eEtrufalsnNIy\x01\x0c') + [
+    "\\u", "\\u12", "\\ud83d", "\\ude00", "\\x", "é", "﻿", "NaN", "Infinity", "-Infinity",
+    "01", "1e", "nul", "tru", "]]", "}}", "[[", "{{", '"', "\ud800", "\u2028"]
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    roll = rng.random()
+    if depth > 3 or roll < 0.4:
+        return rng.choice(SCALARS)
+    if roll < 0.7:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def random_text(rng: random.Random, records: int = 1) -> str:
+    """One or more JSON values, possibly pretty-printed, possibly mutated into invalid text."""
+    texts = [json.dumps(random_value(rng), ensure_ascii=rng.random() < 0.5,
+                        indent=rng.choice([None, None, 1])) for _ in range(records)]
+    text = rng.choice(["\n", "\n\n", " \n "]).join(texts)
+    if rng.random() < 0.15:
+        return "".join(rng.choice(NOISE) for _ in range(rng.randint(0, 12)))
+    for _ in range(rng.choice([0, 0, 1, 2, 3])):
+        i = rng.randint(0, len(text))
+        roll = rng.random()
+        if roll < 0.4 and text:
+            text = text[:i] + text[i + 1:]
+        elif roll < 0.8:
+            text = text[:i] + rng.choice(NOISE) + text[i:]
+        else:
+            text = text[:i] + text[i:i + rng.randint(1, 5)] * 2 + text[i + 5:]
+    return text
+
+
+def random_chunks(rng: random.Random, text: str):
+    i = 0
+    while i < len(text):
+        size = rng.choice([1, 2, 3, 5, 7, 16, 64, 1000])
+        yield text[i:i + size]
+        i += size
+
+
+def reference_error(text: str):
+    try:
+        json.loads(text)
+    except json.JSONDecodeError as e:
+        return str(e)
+    return None
+
+
+def without_positions(message: str) -> str:
+    """Validation output with JSON error details dropped (positions may legitimately differ)."""
+    return re.sub(r"not valid JSON: [^;]*", "not valid JSON", message)
+
+
+class SmallWindows:
+    """Shrink the scanner's regex windows so their edges get exercised."""
+
+    def __init__(self, rng: random.Random):
+        self.string_window = rng.randint(12, 24)
+        self.fast_window = rng.randint(1, 24)
+
+    def __enter__(self):
+        self.saved = json_stream.STRING_WINDOW, json_stream.FAST_WINDOW
+        json_stream.STRING_WINDOW, json_stream.FAST_WINDOW = self.string_window, self.fast_window
+
+    def __exit__(self, *exc):
+        json_stream.STRING_WINDOW, json_stream.FAST_WINDOW = self.saved
+
+
+class ScannerMatchesJsonLoads(unittest.TestCase):
+    CASES = 4000
+
+    def scan(self, rng: random.Random, text: str, **options) -> JsonStreamScanner:
+        scanner = JsonStreamScanner(**options)
+        for chunk in random_chunks(rng, text):
+            scanner.feed(chunk)
+        scanner.close()
+        return scanner
+
+    def check_verdicts(self, seed: int, windows: bool):
+        rng = random.Random(seed)
+        for case in range(self.CASES):
+            text = random_text(rng)
+            expected = reference_error(text)
+            if windows:
+                with SmallWindows(rng):
+                    scanner = self.scan(rng, text)
+            else:
+                scanner = self.scan(rng, text)
+            with self.subTest(case=case, text=text):
+                self.assertEqual(scanner.error is None, expected is None,
+                                 f"scanner: {scanner.error!r}, json: {expected!r}")
+
+    def test_verdicts(self):
+        self.check_verdicts(1, windows=False)
+
+    def test_verdicts_with_small_windows(self):
+        self.check_verdicts(2, windows=True)
+
+    def test_captures_and_streamed_key(self):
+        rng = random.Random(3)
+
+        class Sink:
+            def begin(self, is_string):
+                self.parts = [] if is_string else None
+
+            def write(self, text):
+                self.parts.append(text)
+
+            def finish(self):
+                pass
+
+        for case in range(self.CASES // 2):
+            value = {key: random_value(rng) for key in rng.sample(KEYS, rng.randint(1, 4))}
+            if rng.random() < 0.5:
+                value["tool_output"] = json.dumps(random_value(rng)) * rng.randint(1, 3)
+            text = json.dumps(value, ensure_ascii=rng.random() < 0.5)
+            sink = Sink()
+            sink.parts = None
+            with SmallWindows(rng):
+                scanner = self.scan(rng, text, capture_keys=("success", "error"),
+                                    stream_key="tool_output", stream_sink=sink)
+            with self.subTest(case=case, text=text):
+                self.assertIsNone(scanner.error)
+                for key in ("success", "error"):
+                    if key in value:
+                        self.assertEqual(json.loads(scanner.captured[key]), value[key])
+                if isinstance(value.get("tool_output"), str):
+                    self.assertEqual("".join(sink.parts), value["tool_output"])
+
+    def test_deep_nesting(self):
+        for depth in (999, 5000, json_stream.MAX_DEPTH):
+            scanner = self.scan(random.Random(depth), "[" * depth + "]" * depth)
+            self.assertIsNone(scanner.error)
+        scanner = self.scan(random.Random(0), "[" * (json_stream.MAX_DEPTH + 1))
+        self.assertIn("Nesting too deep", scanner.error)
+
+
+class StreamingMatchesPlainValidation(unittest.TestCase):
+    CASES = 4000
+
+    def test_hook_verdicts(self):
+        rng = random.Random(4)
+        for case in range(self.CASES):
+            output = random_text(rng, records=rng.randint(1, 3))
+            payload = json.dumps({"tool_name": "Bash", "tool_output": output})
+            plain = validate_output.evaluate(payload)
+            with SmallWindows(rng):
+                streamed = validate_output.evaluate_stream(random_chunks(rng, payload))
+            with self.subTest(case=case, output=output):
+                self.assertEqual(without_positions(streamed[1]), without_positions(plain[1]))
+
+    def test_json_lines_records_may_span_lines(self):
+        output = '{"a":\n1}\n{"b":2}'
+        self.assertTrue(validate_output.validate_json_output(output)["valid"])
+        self.assertTrue(validate_output.validate_incrementally(output)["valid"])
+
+    def test_json_lines_failures(self):
+        output = '{"success": true}\n{"success": false, "error": "boom"}\n{"a": 1} x\n{"b": 2}'
+        for result in (validate_output.validate_json_output(output),
+                       validate_output.validate_incrementally(output)):
+            self.assertFalse(result["valid"])
+            self.assertIn("2 of 4 records failed", result["reason"])
+            self.assertIn("line 2: Script reported failure: boom", result["reason"])
+            self.assertIn("line 3: not valid JSON: Extra data", result["reason"])
+
+
+if __name__ == "__main__":
+    unittest.main()